@@ -0,0 +1,105 @@
+import json
+import sys
+
+import degrees
+
+
+def main():
+    if (len(sys.argv) > 4 or
+            (len(sys.argv) == 4 and sys.argv[3] not in degrees.MODES)):
+        sys.exit("Usage: python batch.py [directory] [pairs|-] "
+                 "[bfs|bidirectional|landmarks]")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    filename = sys.argv[2] if len(sys.argv) >= 3 else "-"
+    mode = sys.argv[3] if len(sys.argv) == 4 else "bidirectional"
+
+    print("Loading data...", file=sys.stderr)
+    k = degrees.LANDMARKS if mode == "landmarks" else 0
+    degrees.load_data(directory, "compact", k=k)
+    print("Data loaded.", file=sys.stderr)
+
+    if filename == "-":
+        run_batch(sys.stdin, sys.stdout, mode)
+    else:
+        with open(filename, encoding="utf-8") as f:
+            run_batch(f, sys.stdout, mode)
+
+
+def run_batch(lines, out, mode="bidirectional", space=None):
+    """
+    Answer every pair in `lines` against the loaded data, writing one
+    JSON result per line to `out` as soon as it is known.
+    """
+    if space is None:
+        space = degrees.search_space()
+    for line in lines:
+        try:
+            pair = parse_pair(line)
+        except (KeyError, ValueError):
+            result = {"line": line.rstrip("\n"), "error": "Bad pair."}
+        else:
+            if pair is None:
+                continue
+            result = answer(*pair, mode, space)
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+
+def parse_pair(line):
+    """
+    Return the (source, target) named by one input line, or None for
+    blank lines. Lines are either a JSON object with "source" and
+    "target" strings, or two names / person_ids separated by a tab.
+
+    Raises KeyError or ValueError for lines in neither form.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        query = json.loads(line)
+        pair = query["source"], query["target"]
+        if not all(isinstance(value, str) for value in pair):
+            raise ValueError("source and target must be strings")
+        return pair
+    source, _, target = line.partition("\t")
+    return source.strip(), target.strip()
+
+
+def answer(source, target, mode="bidirectional", space=None):
+    """
+    Return a JSON-ready dict answering how `source` and `target`
+    (names or person_ids) are connected.
+    """
+    result = {"source": source, "target": target}
+    ids = []
+    for value in (source, target):
+        candidates = degrees.person_ids_for(value)
+        if not candidates:
+            result["error"] = "Person not found."
+            result["candidates"] = [
+                person_id for person_id, _ in degrees.similar_names(value)
+            ]
+            return result
+        if len(candidates) > 1:
+            result["error"] = "Ambiguous name."
+            result["candidates"] = candidates
+            return result
+        ids.append(candidates[0])
+
+    result["source_id"], result["target_id"] = ids
+    path = degrees.shortest_path(ids[0], ids[1], mode, space)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {"movie_id": movie_id, "person_id": person_id}
+            for movie_id, person_id in path
+        ]
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import degrees
+
+# Default (people, movies) sizes to benchmark
+SIZES = [(10000, 8000), (100000, 80000)]
+
+# Stars per movie, and how strongly stars favour a few hub people:
+# person i is drawn as int(n * random() ** SKEW), so 1 is uniform and
+# larger values give a heavier-tailed degree distribution
+STARS_PER_MOVIE = 4
+SKEW = 2.0
+
+QUERIES = 50
+SEED = 1
+LANDMARKS = 8
+
+# Plain BFS explores most of the graph per query, so it is only timed
+# on graphs up to this many people
+BFS_LIMIT = 20000
+
+# Loads each backend in a fresh interpreter, so that its peak memory is
+# that of the load alone
+LOAD_SCRIPT = (
+    "import json, sys, degrees\n"
+    "degrees.load_data(sys.argv[1], sys.argv[2], k=int(sys.argv[3]))\n"
+    "print(json.dumps(degrees.load_stats))\n"
+)
+
+SYLLABLES = [
+    "an", "ber", "chen", "da", "el", "go", "han", "is", "jo", "ka", "li",
+    "mar", "na", "or", "per", "qui", "ro", "sa", "ton", "ul", "ve", "wi"
+]
+
+
+def main():
+    sizes = []
+    for arg in sys.argv[1:]:
+        try:
+            n_people, n_movies = (int(n) for n in arg.split(","))
+        except ValueError:
+            sys.exit("Usage: python benchmark.py [people,movies ...]")
+        sizes.append((n_people, n_movies))
+
+    results = []
+    for n_people, n_movies in sizes or SIZES:
+        print(f"Benchmarking {n_people} people, {n_movies} movies...",
+              file=sys.stderr)
+        # Snapshots and landmarks of the generated data are cached next
+        # to it, and removed with it
+        previous = os.environ.get("DEGREES_CACHE")
+        with tempfile.TemporaryDirectory() as root:
+            directory = os.path.join(root, "data")
+            os.mkdir(directory)
+            os.environ["DEGREES_CACHE"] = os.path.join(root, "cache")
+            try:
+                generate(directory, n_people, n_movies, STARS_PER_MOVIE,
+                         SKEW, SEED)
+                results.append(run(directory, n_people, n_movies))
+            finally:
+                if previous is None:
+                    del os.environ["DEGREES_CACHE"]
+                else:
+                    os.environ["DEGREES_CACHE"] = previous
+
+    print(json.dumps({
+        "config": {
+            "stars_per_movie": STARS_PER_MOVIE,
+            "skew": SKEW,
+            "queries": QUERIES,
+            "seed": SEED,
+            "landmarks": LANDMARKS
+        },
+        "results": results
+    }, indent=2))
+
+
+def generate(directory, n_people, n_movies, stars_per_movie, skew, seed):
+    """
+    Write synthetic people.csv, movies.csv and stars.csv files to
+    `directory`.
+    """
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(
+            rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))
+        ).capitalize()
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(n_people):
+            writer.writerow([i + 1, f"{word()} {word()}",
+                             rng.randint(1900, 2010)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(n_movies):
+            writer.writerow([i + 1, f"{word()} {word()}",
+                             rng.randint(1920, 2023)])
+
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(n_movies):
+            for _ in range(stars_per_movie):
+                person = int(n_people * rng.random() ** skew)
+                writer.writerow([person + 1, movie + 1])
+
+
+def run(directory, n_people, n_movies):
+    """
+    Time loading `directory` with each backend and answering the same
+    random queries with each search mode.
+    """
+    result = {
+        "people": n_people, "movies": n_movies, "load": {}, "queries": {}
+    }
+    rng = random.Random(SEED)
+    ids = [str(i + 1) for i in range(n_people)]
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(QUERIES)]
+
+    loads = [
+        ("dict", "dict", 0),
+        ("compact", "compact_cold", 0),
+        ("compact", "compact_snapshot", 0),
+        ("compact", "compact_landmarks", LANDMARKS)
+    ]
+    for backend, label, k in loads:
+        result["load"][label] = measure_load(directory, backend, k)
+        if label not in ("dict", "compact_landmarks"):
+            continue
+        degrees.load_data(directory, backend, k=k)
+
+        modes = ["bidirectional"]
+        if n_people <= BFS_LIMIT:
+            modes.insert(0, "bfs")
+        if backend == "compact":
+            modes.append("landmarks")
+        for mode in modes:
+            result["queries"][f"{backend}/{mode}"] = time_queries(pairs, mode)
+    return result
+
+
+def measure_load(directory, backend, k):
+    """
+    Load `directory` with `backend` and `k` landmarks in a fresh
+    Python process, caching in this process's $DEGREES_CACHE, and
+    return its load_stats, whose process_peak_rss_mb is then the peak
+    of that load.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-c", LOAD_SCRIPT, directory, backend, str(k)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=dict(os.environ), capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout)
+
+
+def time_queries(pairs, mode):
+    """
+    Answer every pair with `mode` and summarize latency and work done.
+    """
+    space = degrees.search_space()
+    latencies = []
+    for source, target in pairs:
+        start = time.perf_counter()
+        degrees.shortest_path(source, target, mode, space)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Count work in a second pass so the counters do not skew latency
+    totals = {}
+    peak = 0
+    for source, target in pairs:
+        stats = {}
+        degrees.shortest_path(source, target, mode, space, stats)
+        for name, value in stats.items():
+            totals[name] = totals.get(name, 0) + value
+        peak = max(peak, stats.get("frontier_peak", 0))
+
+    latencies.sort()
+    summary = {
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 3)
+    }
+    for name in ("expanded", "neighbor_pairs", "neighbor_sets", "visited",
+                 "frontier_peak"):
+        summary[f"mean_{name}"] = round(totals.get(name, 0) / len(pairs), 1)
+    summary["max_frontier_peak"] = peak
+    return summary
+
+
+if __name__ == "__main__":
+    main()
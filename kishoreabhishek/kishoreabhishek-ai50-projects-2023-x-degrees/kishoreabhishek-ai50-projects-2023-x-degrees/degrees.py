@@ -1,7 +1,30 @@
-import csv
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import MoviesView, NamesView, PeopleView, load_graph, read_rows
+from landmarks import load_landmarks
+from nameindex import NameIndex
+from search import (SearchSpace, all_shortest_paths, astar, bfs, bfs_tree,
+                    bidirectional_bfs, instrument, k_shortest_paths,
+                    path_to, ranked_shortest_paths)
+
+BACKENDS = ("dict", "compact")
+
+# Number of landmarks main loads for the "landmarks" search mode
+LANDMARKS = 16
+
+# Orders shortest_paths can rank paths in, by the total of their movies'
+# star counts or release years
+RANKINGS = ("popularity", "year")
+
+# Search strategies available to shortest_path
+MODES = {
+    "bfs": bfs,
+    "bidirectional": bidirectional_bfs,
+    "landmarks": lambda source, target, neighbors, space=None: astar(
+        source, target, neighbors, landmark_heuristic(target), space
+    )
+}
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,55 +35,159 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed Graph when loaded with the "compact" backend
+graph = None
+
+# LandmarkIndex over `graph`, when loaded with landmarks
+landmarks = None
+
+# NameIndex for prefix and fuzzy name search
+name_index = None
+
+# Counts, timings and data-quality problems from the last load_data
+load_stats = {}
 
-def load_data(directory):
+
+def load_data(directory, backend="dict", snapshot=True, k=0, details=True):
     """
     Load data from CSV files into memory.
+
+    The "dict" backend fills `people` and `movies` with nested dicts.
+    The "compact" backend stores everything in a Graph and exposes
+    read-only views of it as `names`, `people` and `movies`. Unless
+    `snapshot` is False it maps a binary snapshot of the Graph from
+    the cache (see graph.cache_files), rebuilding it whenever the CSV
+    files change size or modification time. With
+    `details` False and no current snapshot, it skips births, titles
+    and years until something first looks them up.
+
+    With the "compact" backend and `k` > 0, also load (or build and
+    cache) an index of `k` landmarks, which enables
+    separation_bounds and the "landmarks" search mode.
+
+    Row counts, orphaned stars, load time and the peak memory of the
+    process so far (which includes anything before this load) are
+    recorded in `load_stats`.
+    """
+    global names, people, movies, graph, landmarks, name_index
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}")
+    load_stats.clear()
+    start = time.perf_counter()
+
+    if backend == "compact":
+        graph = load_graph(directory, snapshot, details, load_stats)
+        names = NamesView(graph)
+        people = PeopleView(graph)
+        movies = MoviesView(graph)
+        landmarks = load_landmarks(directory, graph, k) if k > 0 else None
+        name_index = graph.name_index()
+    else:
+        names, people, movies = {}, {}, {}
+        graph = None
+        landmarks = None
+        load_dicts(directory)
+        name_index = NameIndex.build(
+            (person["name"], person_id) for person_id, person in people.items()
+        )
+
+    load_stats["seconds"] = round(time.perf_counter() - start, 3)
+    load_stats["process_peak_rss_mb"] = peak_rss_mb()
+
+
+def load_dicts(directory):
+    """
+    Fill `names`, `people` and `movies` from the CSV files, streaming
+    positional rows and interning the strings that repeat.
     """
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    rows = read_rows(
+        f"{directory}/people.csv", ("id", "name", "birth"), load_stats
+    )
+    for person_id, name, birth in rows:
+        people[person_id] = {
+            "name": name,
+            "birth": sys.intern(birth),
+            "movies": set()
+        }
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    rows = read_rows(
+        f"{directory}/movies.csv", ("id", "title", "year"), load_stats
+    )
+    for movie_id, title, year in rows:
+        movies[movie_id] = {
+            "title": title,
+            "year": sys.intern(year),
+            "stars": set()
+        }
+
+    # Load stars, counting rows that refer to unknown people or movies
+    unknown_people = unknown_movies = 0
+    rows = read_rows(
+        f"{directory}/stars.csv", ("person_id", "movie_id"), load_stats
+    )
+    for person_id, movie_id in rows:
+        person = people.get(person_id)
+        movie = movies.get(movie_id)
+        if person is None or movie is None:
+            unknown_people += person is None
+            unknown_movies += movie is None
+            continue
+        person["movies"].add(sys.intern(movie_id))
+        movie["stars"].add(sys.intern(person_id))
+
+    load_stats["people"] = len(people)
+    load_stats["movies"] = len(movies)
+    load_stats["stars"] = sum(
+        len(person["movies"]) for person in people.values()
+    )
+    load_stats["orphaned_stars"] = {
+        "unknown_person": unknown_people,
+        "unknown_movie": unknown_movies
+    }
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident memory of this process so far in MB,
+    or None where the resource module is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    if (len(sys.argv) > 4 or
+            (len(sys.argv) >= 3 and sys.argv[2] not in BACKENDS) or
+            (len(sys.argv) == 4 and sys.argv[3] not in MODES)):
+        sys.exit("Usage: python degrees.py [directory] "
+                 "[dict|compact] [bfs|bidirectional|landmarks]\n"
+                 "The compact backend caches the graph in $DEGREES_CACHE "
+                 "(default ~/.cache/degrees)\nand rebuilds it when a CSV "
+                 "file changes size or modification time.")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    backend = sys.argv[2] if len(sys.argv) >= 3 else "dict"
+    mode = sys.argv[3] if len(sys.argv) == 4 else "bfs"
+    if mode == "landmarks" and backend != "compact":
+        sys.exit("The landmarks mode needs the compact backend.")
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    load_data(directory, backend, k=LANDMARKS if mode == "landmarks" else 0)
+    print(f"Data loaded in {load_stats['seconds']} seconds.")
+    orphaned = sum(load_stats.get("orphaned_stars", {}).values())
+    if orphaned:
+        print(f"Skipped {orphaned} stars rows for unknown people or movies.")
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +196,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, mode)
 
     if path is None:
         print("Not connected.")
@@ -84,57 +211,61 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, mode="bfs", space=None, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `mode` picks the search strategy from MODES, searching in `space`
+    (a search.SearchSpace, such as one from search_space) if given.
+    If `stats` is a dict, counters and per-phase timings of the search
+    are added to it.
+
     If no possible path, returns None.
     """
+    search = MODES[mode]
+    if graph is not None:
+        neighbors = graph.neighbors
+        source, target = graph.person(source), graph.person(target)
+    else:
+        neighbors = neighbors_for_person
+    if stats is None:
+        path = search(source, target, neighbors, space)
+        return translate(path)
 
-    # TODO
-    if source == target:
-        return [(source,next(iter(people[source]["movies"])))]
-    qfrontier = []
-    pparent = {}
-    visited = set()
-    qfrontier.append((source,None))
-    visited.add(source)
-    pparent[source] = None
-    bfound=False
-    targetmovie = None
-    spath=[]
-    snewpth=None
-    while qfrontier:
-        person = qfrontier.pop(0)
-        if person[0] == target:
-            bfound = True
-            targetmovie = person[1]
-            break
-        for neighbor in neighbors_for_person(person[0]):
-            if not neighbor[1] in visited:
-                qfrontier.append((neighbor[1],neighbor[0]))
-                visited.add(neighbor[1])
-                pparent[neighbor[1]] = (person[0],neighbor[0])
-
-    if bfound:
-        snewpth = []
-        spath.append((targetmovie,target))
-        print(movies[targetmovie],people[target])
-        per = pparent[target]
-        while per is not None:
-            if per[0] != source:
-                spath.append((pparent[per[0]][1], per[0]))
-                print(movies[pparent[per[0]][1]], people[per[0]])
-                per = pparent[per[0]]
-
-            else:
-                break
-
-    while spath:
-        tpath = spath.pop()
-        snewpth.append((tpath[0],tpath[1]))
-    return snewpth
+    if space is None:
+        space = SearchSpace()
+    start = time.perf_counter()
+    path = search(source, target, instrument(neighbors, space, stats), space)
+    searched = time.perf_counter()
+    path = translate(path)
+    stats["visited"] = space.visited()
+    stats["neighbor_sets"] = stats["expanded"] if graph is None else 0
+    stats["search_seconds"] = searched - start
+    stats["translate_seconds"] = time.perf_counter() - searched
+    return path
+
+
+def search_space():
+    """
+    Returns a search.SearchSpace to reuse across queries on the loaded
+    data, with an array slot per person for the compact backend.
+    """
+    if graph is not None:
+        return SearchSpace(len(graph.person_ids))
+    return SearchSpace()
+
+
+def translate(path):
+    """
+    Returns a path found by a search as (movie_id, person_id) pairs.
+    """
+    if graph is None or path is None:
+        return path
+    return [
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in path
+    ]
 
 
 def person_id_for_name(name):
@@ -144,6 +275,20 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        person_ids = [person_id for person_id, _ in similar_names(name)]
+        if len(person_ids) == 0:
+            return None
+        print(f"No '{name}'. Did you mean:")
+        for person_id in person_ids:
+            person = people[person_id]
+            print(f"ID: {person_id}, Name: {person['name']}, "
+                  f"Birth: {person['birth']}")
+        try:
+            person_id = input("Intended Person ID: ")
+            if person_id in person_ids:
+                return person_id
+        except ValueError:
+            pass
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -163,11 +308,201 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def shortest_paths(source, target, rank=None):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connect the source to the target, one at a time.
+
+    If `rank` is one of RANKINGS, paths come out in decreasing order
+    of the total popularity or year of their movies; otherwise in no
+    particular order. Either way only the graph of shortest paths is
+    kept in memory, so callers can stop after as many as they need.
+    """
+    if graph is not None:
+        neighbors = graph.neighbors
+        source, target = graph.person(source), graph.person(target)
+    else:
+        neighbors = neighbors_for_person
+    if rank is None:
+        paths = all_shortest_paths(source, target, neighbors)
+    else:
+        paths = ranked_shortest_paths(
+            source, target, neighbors, movie_score(rank)
+        )
+    for path in paths:
+        yield translate(path)
+
+
+def simple_paths(source, target, k, space=None):
+    """
+    Yields up to `k` lists of (movie_id, person_id) pairs that connect
+    the source to the target without visiting anyone twice, shortest
+    first. `space` is a search.SearchSpace to search in, as for
+    shortest_path.
+    """
+    if graph is not None:
+        neighbors = graph.neighbors
+        source, target = graph.person(source), graph.person(target)
+    else:
+        neighbors = neighbors_for_person
+    for path in k_shortest_paths(source, target, neighbors, k, space):
+        yield translate(path)
+
+
+def movie_score(rank):
+    """
+    Returns a function scoring a movie, as used by the searches, by
+    the `rank` named in RANKINGS.
+    """
+    if rank not in RANKINGS:
+        raise ValueError(f"unknown ranking {rank!r}")
+    if graph is not None:
+        offsets = graph.movie_offsets
+        if rank == "popularity":
+            return lambda movie: offsets[movie + 1] - offsets[movie]
+        graph.load_details()
+        return lambda movie: year_of(graph.movie_years[movie])
+    if rank == "popularity":
+        return lambda movie: len(movies[movie]["stars"])
+    return lambda movie: year_of(movies[movie]["year"])
+
+
+def year_of(year):
+    """
+    Returns a movie year as an int, counting unknown years as 0.
+    """
+    try:
+        return int(year)
+    except ValueError:
+        return 0
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two person_ids from the landmark index, without searching.
+    Both are None if the two are provably not connected, and upper
+    is None if no landmark reaches both within landmarks.FAR degrees.
+    """
+    if landmarks is None:
+        raise ValueError("load_data was called without landmarks")
+    return landmarks.bounds(graph.person(source), graph.person(target))
+
+
+def landmark_heuristic(target):
+    """
+    Returns the landmark lower bound to person index `target` used
+    by the "landmarks" search mode.
+    """
+    if landmarks is None:
+        raise ValueError("load_data was called without landmarks")
+    return landmarks.heuristic(target)
+
+
+def distances_from(source):
+    """
+    Returns a dict mapping the person_id of everyone connected to
+    the source to their degrees of separation from it.
+    """
+    if graph is not None:
+        _, dist = bfs_tree(graph.person(source), graph.neighbors)
+        return {
+            graph.person_ids[person]: hops for person, hops in dist.items()
+        }
+    _, dist = bfs_tree(source, neighbors_for_person)
+    return dict(dist)
+
+
+def paths_from(source, targets, space=None):
+    """
+    Returns a dict mapping each target to its shortest_path from the
+    source, answering them all from a single breadth-first search.
+    Targets that are unknown or unreachable map to None.
+    """
+    if graph is not None:
+        indices = {}
+        for target in targets:
+            try:
+                indices[target] = graph.person(target)
+            except KeyError:
+                indices[target] = None
+        pparent, _ = bfs_tree(
+            graph.person(source), graph.neighbors,
+            [person for person in indices.values() if person is not None],
+            space
+        )
+        paths = {}
+        for target, person in indices.items():
+            if person is None or person not in pparent:
+                paths[target] = None
+                continue
+            paths[target] = [
+                (graph.movie_ids[m], graph.person_ids[p])
+                for m, p in path_to(pparent, person)
+            ]
+        return paths
+
+    pparent, _ = bfs_tree(source, neighbors_for_person, targets, space)
+    return {
+        target: path_to(pparent, target) if target in pparent else None
+        for target in targets
+    }
+
+
+def complete_name(prefix, limit=10):
+    """
+    Returns the person_ids of people whose name starts with `prefix`,
+    for up to `limit` distinct names in alphabetical order.
+    """
+    person_ids = []
+    for _, entries in name_index.prefix(prefix, limit):
+        person_ids.extend(person_id_of(entry) for entry in entries)
+    return person_ids
+
+
+def similar_names(name, limit=10, max_distance=2):
+    """
+    Returns (person_id, distance) pairs for people whose name is
+    within `max_distance` edits of `name`, for up to `limit` distinct
+    names, closest first.
+    """
+    matches = name_index.fuzzy(name, limit, max_distance)
+    return [
+        (person_id_of(entry), distance)
+        for _, entries, distance in matches
+        for entry in entries
+    ]
+
+
+def person_id_of(entry):
+    """
+    Returns the person_id for a person as stored in `name_index`.
+    """
+    return graph.person_ids[entry] if graph is not None else entry
+
+
+def person_ids_for(value):
+    """
+    Returns every person_id that `value` could refer to: `value`
+    itself if it is a known person_id, otherwise the people with
+    that name. Never prompts.
+    """
+    if value in people:
+        return [value]
+    return sorted(names.get(value.lower(), set()))
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        person = graph.person(person_id)
+        return {
+            (graph.movie_ids[movie], graph.person_ids[neighbor])
+            for movie, neighbor in graph.neighbors(person)
+        }
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
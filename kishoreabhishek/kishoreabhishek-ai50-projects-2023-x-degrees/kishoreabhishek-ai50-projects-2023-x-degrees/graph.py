@@ -0,0 +1,708 @@
+import csv
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+
+from nameindex import NameIndex, build_trigrams, normalize
+
+# Bump whenever the snapshot layout or Graph contents change
+SNAPSHOT_VERSION = 2
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_HEADER = struct.Struct("=8sI32sI")
+SNAPSHOT_SECTION = struct.Struct("=QQ")
+SNAPSHOT_NAME = ".degrees.snapshot"
+
+# Snapshot sections in file order: (Graph attribute, kind) where kind
+# is "table" for a StringTable or an array typecode
+SNAPSHOT_LAYOUT = (
+    ("person_ids", "table"),
+    ("person_names", "table"),
+    ("person_births", "table"),
+    ("movie_ids", "table"),
+    ("movie_titles", "table"),
+    ("movie_years", "table"),
+    ("name_keys", "table"),
+    ("name_people", "i"),
+    ("name_grams", "table"),
+    ("name_gram_offsets", "q"),
+    ("name_gram_postings", "i"),
+    ("person_offsets", "q"),
+    ("person_movies", "i"),
+    ("movie_offsets", "q"),
+    ("movie_stars", "i")
+)
+SNAPSHOT_SECTIONS = sum(
+    2 if kind == "table" else 1 for _, kind in SNAPSHOT_LAYOUT
+)
+
+
+class StringTable(Sequence):
+    """
+    Immutable sequence of strings packed into one UTF-8 blob, where
+    string `i` is `data[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, data=b"", offsets=None):
+        self.data = data
+        self.offsets = offsets if offsets is not None else array("q", [0])
+
+    @classmethod
+    def from_strings(cls, strings):
+        """
+        Pack an iterable of strings into a StringTable.
+        """
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = array("q", [0])
+        total = 0
+        for s in encoded:
+            total += len(s)
+            offsets.append(total)
+        return cls(b"".join(encoded), offsets)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        offsets = self.offsets
+        return str(self.data[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class Graph():
+    """
+    Compact person <-> movie graph.
+
+    People and movies are interned to dense integers: their position
+    in `person_ids` / `movie_ids`, which are sorted so an IMDb id can be
+    found again by binary search. The bipartite star graph is stored
+    twice in CSR form: the movies of person `p` are
+    `person_movies[person_offsets[p]:person_offsets[p + 1]]` and the
+    stars of movie `m` are
+    `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+
+    `name_keys` holds every normalized name in sorted order and
+    `name_people` the person index each of those entries belongs to;
+    the `name_gram` arrays are their trigram index (see nameindex).
+    """
+
+    def __init__(self):
+        self.person_ids = StringTable()
+        self.person_names = StringTable()
+        self.person_births = StringTable()
+        self.movie_ids = StringTable()
+        self.movie_titles = StringTable()
+        self.movie_years = StringTable()
+        self.name_keys = StringTable()
+        self.name_people = array("i")
+        self.name_grams = StringTable()
+        self.name_gram_offsets = array("q", [0])
+        self.name_gram_postings = array("i")
+        self.person_offsets = array("q", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("q", [0])
+        self.movie_stars = array("i")
+        self.mapping = None
+
+        # Directory to read births, titles and years from when they
+        # were skipped at load time
+        self.details = None
+
+    @classmethod
+    def from_csv(cls, directory, details=True, stats=None):
+        """
+        Build a graph from the people, movies and stars CSV files
+        in `directory`.
+
+        With `details` False, births, titles and years are not read
+        until load_details is called (the views call it the first time
+        one of them is read).
+        Row counts, orphaned and duplicate stars are added to `stats`
+        if it is given.
+        """
+        if stats is None:
+            stats = {}
+        graph = cls()
+
+        if details:
+            columns = read_columns(
+                f"{directory}/people.csv", ("id", "name", "birth"), stats
+            )
+        else:
+            columns = read_columns(
+                f"{directory}/people.csv", ("id", "name"), stats
+            )
+        order = sorted(range(len(columns[0])), key=columns[0].__getitem__)
+        person_ids = [columns[0][i] for i in order]
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        graph.person_ids = StringTable.from_strings(person_ids)
+        del person_ids
+        graph.person_names = StringTable.from_strings(
+            columns[1][i] for i in order
+        )
+        if details:
+            graph.person_births = StringTable.from_strings(
+                columns[2][i] for i in order
+            )
+        stats["people"] = len(order)
+
+        keys = [normalize(columns[1][i]) for i in order]
+        del columns, order
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        keys = [keys[i] for i in order]
+        graph.name_keys = StringTable.from_strings(keys)
+        graph.name_people = array("i", order)
+        grams, graph.name_gram_offsets, graph.name_gram_postings = (
+            build_trigrams(keys)
+        )
+        graph.name_grams = StringTable.from_strings(grams)
+        del keys, grams, order
+
+        if details:
+            columns = read_columns(
+                f"{directory}/movies.csv", ("id", "title", "year"), stats
+            )
+        else:
+            columns = read_columns(f"{directory}/movies.csv", ("id",), stats)
+        order = sorted(range(len(columns[0])), key=columns[0].__getitem__)
+        movie_ids = [columns[0][i] for i in order]
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        graph.movie_ids = StringTable.from_strings(movie_ids)
+        del movie_ids
+        if details:
+            graph.movie_titles = StringTable.from_strings(
+                columns[1][i] for i in order
+            )
+            graph.movie_years = StringTable.from_strings(
+                columns[2][i] for i in order
+            )
+        else:
+            graph.details = directory
+        stats["movies"] = len(order)
+        del columns, order
+
+        # Collect (person, movie) edges, counting rather than hiding
+        # duplicates and stars that refer to unknown people or movies
+        edge_people = array("i")
+        edge_movies = array("i")
+        seen = set()
+        unknown_people = unknown_movies = duplicates = 0
+        rows = read_rows(
+            f"{directory}/stars.csv", ("person_id", "movie_id"), stats
+        )
+        for person_id, movie_id in rows:
+            person = person_index.get(person_id)
+            movie = movie_index.get(movie_id)
+            if person is None or movie is None:
+                unknown_people += person is None
+                unknown_movies += movie is None
+                continue
+            key = (person << 32) | movie
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            edge_people.append(person)
+            edge_movies.append(movie)
+        del seen, person_index, movie_index
+
+        stats["stars"] = len(edge_people)
+        stats["orphaned_stars"] = {
+            "unknown_person": unknown_people,
+            "unknown_movie": unknown_movies
+        }
+        stats["duplicate_stars"] = duplicates
+        graph.build(edge_people, edge_movies)
+        return graph
+
+    def load_details(self):
+        """
+        Read the births, titles and years skipped by
+        from_csv(details=False).
+        """
+        directory = self.details
+        if directory is None:
+            return
+        births = [""] * len(self.person_ids)
+        for person_id, birth in read_rows(
+                f"{directory}/people.csv", ("id", "birth")):
+            births[find(self.person_ids, person_id)] = birth
+        self.person_births = StringTable.from_strings(births)
+        del births
+
+        titles = [""] * len(self.movie_ids)
+        years = [""] * len(self.movie_ids)
+        for movie_id, title, year in read_rows(
+                f"{directory}/movies.csv", ("id", "title", "year")):
+            movie = find(self.movie_ids, movie_id)
+            titles[movie] = title
+            years[movie] = year
+        self.movie_titles = StringTable.from_strings(titles)
+        self.movie_years = StringTable.from_strings(years)
+        self.details = None
+
+    def detail(self, attribute, index):
+        """
+        Return entry `index` of the births, titles or years table named
+        `attribute`, reading them first if they were skipped.
+        """
+        self.load_details()
+        return getattr(self, attribute)[index]
+
+    def build(self, edge_people, edge_movies):
+        """
+        Build both CSR adjacency structures from parallel arrays of
+        person and movie indices.
+        """
+        self.person_offsets, self.person_movies = csr(
+            len(self.person_ids), edge_people, edge_movies
+        )
+        self.movie_offsets, self.movie_stars = csr(
+            len(self.movie_ids), edge_movies, edge_people
+        )
+
+    @classmethod
+    def from_snapshot(cls, filename, key):
+        """
+        Memory-map a snapshot written by `save`.
+        Raises ValueError if the file has another version or key.
+        """
+        with open(filename, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        magic, version, stored, count = SNAPSHOT_HEADER.unpack_from(view)
+        if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or
+                stored != key or count != SNAPSHOT_SECTIONS):
+            view.release()
+            mapping.close()
+            raise ValueError(f"stale snapshot {filename}")
+
+        sections = []
+        position = SNAPSHOT_HEADER.size
+        for _ in range(count):
+            start, length = SNAPSHOT_SECTION.unpack_from(view, position)
+            sections.append(view[start:start + length])
+            position += SNAPSHOT_SECTION.size
+
+        graph = cls()
+        for attribute, kind in SNAPSHOT_LAYOUT:
+            if kind == "table":
+                data = sections.pop(0)
+                offsets = sections.pop(0).cast("q")
+                setattr(graph, attribute, StringTable(data, offsets))
+            else:
+                setattr(graph, attribute, sections.pop(0).cast(kind))
+        graph.mapping = mapping
+        return graph
+
+    def save(self, filename, key):
+        """
+        Write the graph to `filename` as a snapshot tagged with `key`.
+        Every section is 8-byte aligned so `from_snapshot` can map it
+        straight back into arrays.
+        """
+        sections = []
+        for attribute, kind in SNAPSHOT_LAYOUT:
+            value = getattr(self, attribute)
+            if kind == "table":
+                sections.append(bytes(value.data))
+                sections.append(bytes(value.offsets))
+            else:
+                sections.append(bytes(value))
+
+        position = (SNAPSHOT_HEADER.size +
+                    SNAPSHOT_SECTION.size * len(sections))
+        table = []
+        for section in sections:
+            position += -position % 8
+            table.append((position, len(section)))
+            position += len(section)
+
+        def write(f):
+            f.write(SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, SNAPSHOT_VERSION, key, SNAPSHOT_SECTIONS
+            ))
+            for start, length in table:
+                f.write(SNAPSHOT_SECTION.pack(start, length))
+            for (start, _), section in zip(table, sections):
+                f.write(bytes(start - f.tell()))
+                f.write(section)
+
+        replace_file(filename, write)
+
+    def person(self, person_id):
+        """
+        Return the index of IMDb person `person_id`.
+        Raises KeyError if there is no such person.
+        """
+        return find(self.person_ids, person_id)
+
+    def movie(self, movie_id):
+        """
+        Return the index of IMDb movie `movie_id`.
+        Raises KeyError if there is no such movie.
+        """
+        return find(self.movie_ids, movie_id)
+
+    def name_index(self):
+        """
+        Return a NameIndex over this graph's people, whose entries are
+        person indices.
+        """
+        return NameIndex(
+            self.name_keys, self.name_people, self.name_grams,
+            self.name_gram_offsets, self.name_gram_postings
+        )
+
+    def people_named(self, name):
+        """
+        Return the indices of every person whose lowercased name
+        is `name`.
+        """
+        return [
+            person for person in self.name_index().exact(name)
+            if self.person_names[person].lower() == name
+        ]
+
+    def movies_of(self, person):
+        """
+        Return the movie indices `person` starred in.
+        """
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Return the person indices that starred in `movie`.
+        """
+        offsets = self.movie_offsets
+        return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yield (movie, person) index pairs for people who starred
+        with `person`, including `person` itself.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_stars[j]
+
+
+def read_rows(filename, names, stats=None):
+    """
+    Yield a tuple of the columns called `names` for each row of CSV
+    file `filename`, using positional csv.reader rows rather than a
+    dict per row. Rows too short to hold every column are skipped and
+    counted in `stats`.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        wanted = positions(next(reader, []), names)
+        last = max(wanted)
+        malformed = 0
+        for row in reader:
+            if len(row) <= last:
+                malformed += 1
+                continue
+            yield tuple([row[position] for position in wanted])
+    if malformed and stats is not None:
+        stats["malformed_rows"] = stats.get("malformed_rows", 0) + malformed
+
+
+def read_columns(filename, names, stats=None):
+    """
+    Read the columns called `names` from CSV file `filename` into one
+    list each.
+    """
+    columns = tuple([] for _ in names)
+    appends = [column.append for column in columns]
+    for row in read_rows(filename, names, stats):
+        for append, value in zip(appends, row):
+            append(value)
+    return columns
+
+
+def positions(header, names):
+    """
+    Return the position of each column in `names` within `header`.
+    """
+    try:
+        return [header.index(name) for name in names]
+    except ValueError:
+        raise ValueError(f"CSV header {header} lacks one of {names}")
+
+
+def snapshot_key(directory):
+    """
+    Return a digest identifying the current people, movies and stars
+    CSV files in `directory` by their size and modification time (not
+    their contents, so an edit keeping both would go unnoticed).
+    """
+    digest = hashlib.sha256(f"v{SNAPSHOT_VERSION}".encode())
+    for name in ("people.csv", "movies.csv", "stars.csv"):
+        stat = os.stat(os.path.join(directory, name))
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.digest()
+
+
+def cache_files(directory, name):
+    """
+    Return the files, in the order they are tried, where the file
+    called `name` built from the data in `directory` may be cached: in
+    $DEGREES_CACHE if set, otherwise in a degrees directory under
+    $XDG_CACHE_HOME or ~/.cache, and failing that in a degrees-cache
+    directory under the temporary directory. Each has a prefix unique
+    to `directory`.
+    """
+    roots = [
+        os.environ.get("DEGREES_CACHE") or os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+            "degrees"
+        ),
+        os.path.join(tempfile.gettempdir(), "degrees-cache")
+    ]
+    prefix = hashlib.sha256(os.path.realpath(directory).encode())
+    return [
+        os.path.join(root, prefix.hexdigest()[:16] + name) for root in roots
+    ]
+
+
+def load_cached(directory, name, load):
+    """
+    Return (value, filename) for the first of the cache_files for which
+    `load(filename)` succeeds, or (None, None) if none is current.
+    """
+    for filename in cache_files(directory, name):
+        try:
+            return load(filename), filename
+        except (OSError, TypeError, ValueError, struct.error):
+            pass
+    return None, None
+
+
+def save_cached(directory, name, save):
+    """
+    Call `save(filename)` with the first of the cache_files that can be
+    written, and return it. If none can, warn on stderr (the file will
+    then be rebuilt by every process loading the data, including every
+    worker of a pool) and return None.
+    """
+    for filename in cache_files(directory, name):
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            save(filename)
+        except OSError:
+            continue
+        return filename
+    print(f"Warning: could not cache {name} for {directory}, so it will "
+          f"be rebuilt on every load.", file=sys.stderr)
+    return None
+
+
+def replace_file(filename, write):
+    """
+    Call `write` with a temporary file next to `filename`, then move it
+    into place, so readers never see a partial file. The temporary file
+    is removed if anything fails.
+    """
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            write(f)
+        os.replace(temporary, filename)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def load_graph(directory, snapshot=True, details=True, stats=None):
+    """
+    Return the Graph for `directory`, mapping its cached snapshot (see
+    cache_files) when one matches the CSV files and otherwise parsing
+    the CSV files and caching a fresh snapshot for next time. A graph
+    parsed without `details` is not cached.
+    """
+    if not snapshot:
+        return Graph.from_csv(directory, details, stats)
+
+    key = snapshot_key(directory)
+    graph, filename = load_cached(
+        directory, SNAPSHOT_NAME,
+        lambda filename: Graph.from_snapshot(filename, key)
+    )
+    if graph is not None:
+        if stats is not None:
+            stats["snapshot"] = filename
+            stats["people"] = len(graph.person_ids)
+            stats["movies"] = len(graph.movie_ids)
+            stats["stars"] = len(graph.person_movies)
+        return graph
+
+    graph = Graph.from_csv(directory, details, stats)
+    if details:
+        save_cached(
+            directory, SNAPSHOT_NAME,
+            lambda filename: graph.save(filename, key)
+        )
+    return graph
+
+
+def find(table, key):
+    """
+    Return the position of `key` in the sorted StringTable `table`.
+    Raises KeyError if it is not there.
+    """
+    i = bisect_left(table, key)
+    if i == len(table) or table[i] != key:
+        raise KeyError(key)
+    return i
+
+
+def csr(n, rows, cols):
+    """
+    Return (offsets, indices) arrays for `n` rows given parallel
+    arrays of row and column indices.
+    """
+    offsets = array("q", bytes(8 * (n + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    indices = array("i", bytes(4 * len(cols)))
+    cursor = array("q", offsets[:-1])
+    for row, col in zip(rows, cols):
+        indices[cursor[row]] = col
+        cursor[row] += 1
+    return offsets, indices
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a Graph with the same shape as degrees.names:
+    lowercased name -> set of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        graph = self.graph
+        found = graph.people_named(name)
+        if not found:
+            raise KeyError(name)
+        return {graph.person_ids[person] for person in found}
+
+    def __iter__(self):
+        seen = set()
+        for name in self.graph.person_names:
+            name = name.lower()
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a Graph with the same shape as degrees.people:
+    person_id -> {"name", "birth", "movies"}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person(person_id)
+        return Record({
+            "name": lambda: graph.person_names[person],
+            "birth": lambda: graph.detail("person_births", person),
+            "movies": lambda: {
+                graph.movie_ids[m] for m in graph.movies_of(person)
+            }
+        })
+
+    def __contains__(self, person_id):
+        try:
+            self.graph.person(person_id)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a Graph with the same shape as degrees.movies:
+    movie_id -> {"title", "year", "stars"}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie(movie_id)
+        return Record({
+            "title": lambda: graph.detail("movie_titles", movie),
+            "year": lambda: graph.detail("movie_years", movie),
+            "stars": lambda: {
+                graph.person_ids[p] for p in graph.stars_of(movie)
+            }
+        })
+
+    def __contains__(self, movie_id):
+        try:
+            self.graph.movie(movie_id)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class Record(Mapping):
+    """
+    Read-only dict-like record for one person or movie, where each
+    field is computed from the Graph only when it is read, so reading
+    a name or the stars of a movie never loads skipped details.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __getitem__(self, field):
+        return self.fields[field]()
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __repr__(self):
+        return repr(dict(self))
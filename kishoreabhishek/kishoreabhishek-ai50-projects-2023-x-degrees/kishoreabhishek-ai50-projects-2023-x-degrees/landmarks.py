@@ -0,0 +1,171 @@
+import heapq
+import mmap
+import struct
+from array import array
+
+from graph import load_cached, replace_file, save_cached, snapshot_key
+from search import bfs_tree
+
+# Bump whenever the landmark file layout changes
+LANDMARKS_VERSION = 1
+LANDMARKS_MAGIC = b"LANDMARK"
+LANDMARKS_HEADER = struct.Struct("=8sI32sII")
+LANDMARKS_NAME = ".degrees.landmarks"
+
+# Stored distance for people a landmark cannot reach
+UNREACHABLE = 255
+
+# Stored distance for people at least this far from a landmark; it
+# still gives lower bounds, but no upper bound
+FAR = UNREACHABLE - 1
+
+
+class LandmarkIndex():
+    """
+    Degrees of separation from a few hub people ("landmarks") to
+    everyone else, one byte per person per landmark.
+
+    By the triangle inequality, |d(L, s) - d(L, t)| <= d(s, t) <=
+    d(L, s) + d(L, t) for every landmark L, which gives cheap lower and
+    upper bounds on the distance between any two people. Distances of
+    FAR or more are stored as FAR, which keeps the lower bounds valid
+    but cannot give an upper one.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.mapping = None
+
+    @classmethod
+    def build(cls, graph, k):
+        """
+        Pick the `k` people with the most co-stars in `graph` and
+        breadth-first search from each of them.
+        """
+        movie_offsets = graph.movie_offsets
+        degree = []
+        for person in range(len(graph.person_ids)):
+            degree.append(sum(
+                movie_offsets[movie + 1] - movie_offsets[movie]
+                for movie in graph.movies_of(person)
+            ))
+        landmarks = array("i", heapq.nlargest(
+            k, range(len(degree)), key=degree.__getitem__
+        ))
+
+        distances = []
+        for landmark in landmarks:
+            row = bytearray([UNREACHABLE]) * len(degree)
+            _, dist = bfs_tree(landmark, graph.neighbors)
+            for person, hops in dist.items():
+                row[person] = min(hops, FAR)
+            distances.append(row)
+        return cls(landmarks, distances)
+
+    @classmethod
+    def from_file(cls, filename, key, k):
+        """
+        Memory-map a landmark index written by `save`.
+        Raises ValueError if it was built for other data or another k.
+        """
+        with open(filename, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        magic, version, stored, count, n = LANDMARKS_HEADER.unpack_from(view)
+        if (magic != LANDMARKS_MAGIC or version != LANDMARKS_VERSION or
+                stored != key or count != k):
+            view.release()
+            mapping.close()
+            raise ValueError(f"stale landmark index {filename}")
+
+        position = LANDMARKS_HEADER.size
+        landmarks = view[position:position + 4 * k].cast("i")
+        position += 4 * k
+        distances = []
+        for _ in range(k):
+            distances.append(view[position:position + n])
+            position += n
+        index = cls(landmarks, distances)
+        index.mapping = mapping
+        return index
+
+    def save(self, filename, key):
+        """
+        Write the index to `filename`, tagged with `key`.
+        """
+        n = len(self.distances[0]) if self.distances else 0
+
+        def write(f):
+            f.write(LANDMARKS_HEADER.pack(
+                LANDMARKS_MAGIC, LANDMARKS_VERSION, key,
+                len(self.landmarks), n
+            ))
+            f.write(bytes(self.landmarks))
+            for row in self.distances:
+                f.write(bytes(row))
+
+        replace_file(filename, write)
+
+    def bounds(self, source, target):
+        """
+        Return (lower, upper) bounds on the degrees of separation
+        between person indices `source` and `target`. Returns
+        (None, None) when they are provably not connected; upper is
+        None when no landmark reaches both within FAR degrees.
+        """
+        lower = 0
+        upper = None
+        for row in self.distances:
+            s, t = row[source], row[target]
+            if s == UNREACHABLE and t == UNREACHABLE:
+                continue
+            if s == UNREACHABLE or t == UNREACHABLE:
+                return None, None
+            lower = max(lower, abs(s - t))
+            if s == FAR or t == FAR:
+                continue
+            if upper is None or s + t < upper:
+                upper = s + t
+        return lower, upper
+
+    def heuristic(self, target):
+        """
+        Return a function giving, for any person index, a lower bound
+        on its distance to `target`, or None if it cannot reach it.
+        """
+        rows = [(row, row[target]) for row in self.distances]
+
+        def lower_bound(person):
+            bound = 0
+            for row, t in rows:
+                s = row[person]
+                if s == UNREACHABLE and t == UNREACHABLE:
+                    continue
+                if s == UNREACHABLE or t == UNREACHABLE:
+                    return None
+                if abs(s - t) > bound:
+                    bound = abs(s - t)
+            return bound
+
+        return lower_bound
+
+
+def load_landmarks(directory, graph, k):
+    """
+    Return a LandmarkIndex of `k` landmarks for the graph loaded from
+    `directory`, mapping the cached one (see graph.cache_files) when it
+    is still current and otherwise building and caching a new one.
+    """
+    key = snapshot_key(directory)
+    index, _ = load_cached(
+        directory, LANDMARKS_NAME,
+        lambda filename: LandmarkIndex.from_file(filename, key, k)
+    )
+    if index is None:
+        index = LandmarkIndex.build(graph, k)
+        save_cached(
+            directory, LANDMARKS_NAME,
+            lambda filename: index.save(filename, key)
+        )
+    return index
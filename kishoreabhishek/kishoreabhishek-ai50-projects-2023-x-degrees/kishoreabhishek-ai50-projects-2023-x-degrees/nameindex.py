@@ -0,0 +1,236 @@
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+# Candidates checked with edit_distance per fuzzy result wanted
+FUZZY_CANDIDATES = 20
+
+
+def normalize(name):
+    """
+    Return the form of `name` used for lookups: lowercase, without
+    accents, with runs of whitespace collapsed to single spaces.
+    """
+    decomposed = unicodedata.normalize("NFKD", name.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+def trigrams(key):
+    """
+    Return the set of three-character substrings of a normalized
+    name, padded so the start and end of the name count too.
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_trigrams(keys):
+    """
+    Index the sorted sequence of normalized names `keys` by trigram.
+
+    Returns (grams, offsets, postings): the sorted trigrams and, for
+    trigram `i`, the positions in `keys` of the first entry of every
+    distinct name containing it as
+    `postings[offsets[i]:offsets[i + 1]]`, in increasing order.
+    """
+    index = {}
+    previous = None
+    for position, key in enumerate(keys):
+        if key == previous:
+            continue
+        previous = key
+        for gram in trigrams(key):
+            if gram not in index:
+                index[gram] = array("i")
+            index[gram].append(position)
+
+    grams = sorted(index)
+    offsets = array("q", [0])
+    postings = array("i")
+    for gram in grams:
+        postings.extend(index[gram])
+        offsets.append(len(postings))
+    return grams, offsets, postings
+
+
+def edit_distance(a, b, limit):
+    """
+    Return the Levenshtein distance between `a` and `b`, or None if
+    it is greater than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class NameIndex():
+    """
+    Prefix and fuzzy search over people's names.
+
+    `keys` is the sorted sequence of normalized names, one entry per
+    person, and `people` holds the person each entry belongs to.
+    `grams`, `offsets` and `postings` are the trigram index returned by
+    build_trigrams(keys).
+    """
+
+    def __init__(self, keys, people, grams, offsets, postings):
+        self.keys = keys
+        self.people = people
+        self.grams = grams
+        self.offsets = offsets
+        # Sliced once per query trigram, so avoid copying posting lists
+        self.postings = memoryview(postings)
+
+    @classmethod
+    def build(cls, entries):
+        """
+        Build an index from an iterable of (name, person) pairs.
+        """
+        entries = sorted((normalize(name), person) for name, person in entries)
+        keys = [key for key, _ in entries]
+        people = [person for _, person in entries]
+        return cls(keys, people, *build_trigrams(keys))
+
+    def exact(self, name):
+        """
+        Return the people whose normalized name equals that of `name`.
+        """
+        key = normalize(name)
+        i = bisect_left(self.keys, key)
+        found = []
+        while i < len(self.keys) and self.keys[i] == key:
+            found.append(self.people[i])
+            i += 1
+        return found
+
+    def prefix(self, text, limit=10):
+        """
+        Return up to `limit` (name, people) pairs, in alphabetical
+        order, for the distinct names starting with `text`.
+        """
+        key = normalize(text)
+        keys = self.keys
+        i = bisect_left(keys, key)
+        results = []
+        while i < len(keys) and len(results) < limit:
+            name = keys[i]
+            if not name.startswith(key):
+                break
+            people = []
+            while i < len(keys) and keys[i] == name:
+                people.append(self.people[i])
+                i += 1
+            results.append((name, people))
+        return results
+
+    def fuzzy(self, text, limit=10, max_distance=2):
+        """
+        Return up to `limit` (name, people, distance) triples for the
+        distinct names within `max_distance` edits of `text`, closest
+        first.
+
+        Candidates come from the trigram index: a name within d edits
+        shares all but at most 3d of the query's trigrams, so only names
+        found in the 3d + 1 rarest query trigrams need to be counted.
+        Of those reaching that threshold whose length is within d of
+        the query's, the FUZZY_CANDIDATES * `limit` sharing the most
+        trigrams are checked with edit_distance. Very
+        short queries have no such threshold and only match names
+        sharing at least one trigram.
+        """
+        key = normalize(text)
+        lists = []
+        for gram in trigrams(key):
+            i = bisect_left(self.grams, gram)
+            if i < len(self.grams) and self.grams[i] == gram:
+                lists.append(
+                    self.postings[self.offsets[i]:self.offsets[i + 1]]
+                )
+            else:
+                lists.append(())
+        lists.sort(key=len)
+        threshold = len(lists) - 3 * max_distance
+        rare = lists if threshold <= 0 else lists[:3 * max_distance + 1]
+
+        counts = {}
+        for postings in rare:
+            for position in postings:
+                counts[position] = counts.get(position, 0) + 1
+        if threshold > 0:
+            # Count the candidates in the remaining lists, dropping
+            # each as soon as it can no longer reach the threshold
+            remaining = len(lists) - len(rare)
+            for postings in lists[len(rare):]:
+                remaining -= 1
+                if len(postings) < 4 * len(counts):
+                    # Scanning costs a dict lookup per entry, searching
+                    # a bisect per candidate, so scan short lists
+                    for position in postings:
+                        if position in counts:
+                            counts[position] += 1
+                    counts = {
+                        position: count
+                        for position, count in counts.items()
+                        if count + remaining >= threshold
+                    }
+                    continue
+                for position in list(counts):
+                    if contains(postings, position):
+                        counts[position] += 1
+                    elif counts[position] + remaining < threshold:
+                        del counts[position]
+            counts = {
+                position: count for position, count in counts.items()
+                if count >= threshold
+            }
+        # Names more than max_distance characters longer or shorter
+        # cannot be close enough
+        keys = self.keys
+        counts = {
+            position: count for position, count in counts.items()
+            if abs(len(keys[position]) - len(key)) <= max_distance
+        }
+
+        # Check the names sharing the most trigrams first, and only
+        # as many as a ranked list of `limit` names plausibly needs
+        candidates = sorted(counts, key=counts.get, reverse=True)
+        candidates = candidates[:limit * FUZZY_CANDIDATES]
+
+        results = []
+        for position in candidates:
+            name = self.keys[position]
+            distance = edit_distance(key, name, max_distance)
+            if distance is None:
+                continue
+            people = []
+            i = position
+            while i < len(self.keys) and self.keys[i] == name:
+                people.append(self.people[i])
+                i += 1
+            results.append((distance, name, people))
+        results.sort(key=lambda result: (result[0], result[1]))
+        return [
+            (name, people, distance)
+            for distance, name, people in results[:limit]
+        ]
+
+
+def contains(postings, position):
+    """
+    Return whether sorted `postings` contains `position`.
+    """
+    i = bisect_left(postings, position)
+    return i < len(postings) and postings[i] == position
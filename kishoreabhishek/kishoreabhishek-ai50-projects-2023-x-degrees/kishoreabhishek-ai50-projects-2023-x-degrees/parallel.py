@@ -0,0 +1,112 @@
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+import degrees
+
+# Sources with at least this many targets are answered from one full
+# BFS tree; fewer targets are cheaper as separate bidirectional searches
+TREE_TARGETS = 500
+
+# SearchSpace owned by each worker process
+space = None
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Usage: python parallel.py directory watchlist [processes]")
+    directory = sys.argv[1]
+    processes = int(sys.argv[3]) if len(sys.argv) == 4 else None
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory, "compact")
+    print("Data loaded.", file=sys.stderr)
+
+    # Resolve the watchlist up front and compute all pairs among it
+    watchlist = []
+    with open(sys.argv[2], encoding="utf-8") as f:
+        for line in f:
+            value = line.strip()
+            if not value:
+                continue
+            candidates = degrees.person_ids_for(value)
+            if len(candidates) != 1:
+                print(f"Skipping {value!r}: "
+                      f"{'ambiguous' if candidates else 'not found'}",
+                      file=sys.stderr)
+                continue
+            watchlist.append(candidates[0])
+
+    pairs = [
+        (source, target)
+        for i, source in enumerate(watchlist)
+        for target in watchlist[i + 1:]
+    ]
+    for source, target, path in parallel_shortest_paths(
+            directory, pairs, processes, loaded=True):
+        print(json.dumps({
+            "source_id": source,
+            "target_id": target,
+            "degrees": None if path is None else len(path),
+            "path": path
+        }))
+
+
+def parallel_shortest_paths(directory, pairs, processes=None,
+                            loaded=False):
+    """
+    Yield (source, target, path) for every (source, target) pair,
+    fanning the work out over a pool of `processes` workers.
+
+    Every worker maps the same compact graph snapshot of `directory`,
+    so the graph is shared through the page cache rather than pickled
+    to each worker. Pairs are grouped by source, and sources with at
+    least TREE_TARGETS targets are answered from a single breadth-first
+    search tree.
+
+    Pass `loaded=True` when `directory` has just been loaded with the
+    compact backend, so that its snapshot is not checked twice.
+    """
+    # Make sure an up-to-date snapshot exists before workers map it
+    if not loaded:
+        degrees.load_data(directory, "compact")
+
+    groups = {}
+    for source, target in pairs:
+        groups.setdefault(source, []).append(target)
+
+    processes = processes or os.cpu_count()
+    with Pool(processes, initializer=start_worker,
+              initargs=(directory,)) as pool:
+        for results in pool.imap_unordered(
+                answer_group, groups.items(), chunksize=1):
+            yield from results
+
+
+def start_worker(directory):
+    """
+    Map the graph snapshot into this worker process.
+    """
+    global space
+    degrees.load_data(directory, "compact")
+    space = degrees.search_space()
+
+
+def answer_group(group):
+    """
+    Return (source, target, path) for one source and its targets.
+    """
+    source, targets = group
+    if len(targets) < TREE_TARGETS:
+        return [
+            (source, target,
+             degrees.shortest_path(source, target, "bidirectional", space))
+            for target in targets
+        ]
+    paths = degrees.paths_from(source, targets, space)
+    return [(source, target, paths[target]) for target in targets]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+import heapq
+import itertools
+from collections import deque
+
+
+class SearchSpace():
+    """
+    Frontier and visited containers for one search at a time, kept
+    where callers (such as instrument) can look at them and reused by
+    every search given the same space.
+
+    With `size`, for people numbered 0 to size - 1 (the compact
+    backend), bfs keeps each person's mark and (parent, movie) link in
+    lists with a slot per person, allocated once, instead of a dict
+    that grows with every search. Each search raises the base past
+    every earlier mark, so starting one is O(1). The other searches
+    stop early after reaching only a few people, where a small dict is
+    faster than scattered list slots, so they use the dicts, which each
+    search empties first.
+    """
+
+    def __init__(self, size=None):
+        self.sparent = {}
+        self.tparent = {}
+        self.sdist = {}
+        self.tdist = {}
+        self.sfrontier = deque()
+        self.tfrontier = deque()
+        self.heap = []
+        self.size = size
+        # People reached by the last search over the lists
+        self.reached = 0
+        if size is not None:
+            self.base = 0
+            self.mark = [-1] * size
+            self.link = [None] * size
+
+    def reset(self):
+        """
+        Empty every container, ready for the next search.
+        """
+        self.sparent.clear()
+        self.tparent.clear()
+        self.sdist.clear()
+        self.tdist.clear()
+        self.sfrontier.clear()
+        self.tfrontier.clear()
+        self.heap.clear()
+        self.reached = 0
+        if self.size is not None:
+            self.base += 1
+
+    def visited(self):
+        """
+        Return the number of people the last search reached, from
+        either side.
+        """
+        return len(self.sparent) + len(self.tparent) + self.reached
+
+
+def bfs(source, target, neighbors, space=None):
+    """
+    Breadth-first search from `source` to `target`, where
+    `neighbors(person)` yields (movie, person) pairs.
+
+    Returns the list of (movie, person) pairs leading to `target`,
+    or None if it cannot be reached.
+    """
+    if source == target:
+        return []
+    if space is None:
+        space = SearchSpace()
+    else:
+        space.reset()
+    if space.size is not None:
+        return stamped_bfs(source, target, neighbors, space)
+    qfrontier = space.sfrontier
+    pparent = space.sparent
+    qfrontier.append(source)
+    pparent[source] = None
+    while qfrontier:
+        person = qfrontier.popleft()
+        for movie, neighbor in neighbors(person):
+            if neighbor not in pparent:
+                pparent[neighbor] = (person, movie)
+                if neighbor == target:
+                    return path_to(pparent, target)
+                qfrontier.append(neighbor)
+    return None
+
+
+def bidirectional_bfs(source, target, neighbors, space=None):
+    """
+    Breadth-first search from both `source` and `target` at once,
+    always expanding one full layer of the smaller frontier.
+    The star graph is undirected, so the same `neighbors` serves
+    both directions.
+
+    Returns the same path format as bfs, or None.
+    """
+    if source == target:
+        return []
+    if space is None:
+        space = SearchSpace()
+    else:
+        space.reset()
+    sparent, tparent = space.sparent, space.tparent
+    sdist, tdist = space.sdist, space.tdist
+    sfrontier, tfrontier = space.sfrontier, space.tfrontier
+    sparent[source] = None
+    tparent[target] = None
+    sdist[source] = 0
+    tdist[target] = 0
+    sfrontier.append(source)
+    tfrontier.append(target)
+
+    while sfrontier and tfrontier:
+        forward = len(sfrontier) <= len(tfrontier)
+        if forward:
+            frontier, parent, dist, other = sfrontier, sparent, sdist, tdist
+        else:
+            frontier, parent, dist, other = tfrontier, tparent, tdist, sdist
+
+        # Expand the whole layer, keeping the shortest meeting point
+        best = None
+        for _ in range(len(frontier)):
+            person = frontier.popleft()
+            for movie, neighbor in neighbors(person):
+                if neighbor in other:
+                    length = dist[person] + 1 + other[neighbor]
+                    if best is None or length < best[0]:
+                        if forward:
+                            best = (length, person, movie, neighbor)
+                        else:
+                            best = (length, neighbor, movie, person)
+                if neighbor not in parent:
+                    parent[neighbor] = (person, movie)
+                    dist[neighbor] = dist[person] + 1
+                    frontier.append(neighbor)
+
+        if best is not None:
+            _, smeet, movie, tmeet = best
+            spath = path_to(sparent, smeet)
+            spath.append((movie, tmeet))
+            person = tmeet
+            while tparent[person] is not None:
+                person, movie = tparent[person]
+                spath.append((movie, person))
+            return spath
+    return None
+
+
+def stamped_bfs(source, target, neighbors, space):
+    """
+    bfs over the per-person lists of `space` (see SearchSpace).
+    """
+    base = space.base
+    mark, link = space.mark, space.link
+    qfrontier = space.sfrontier
+    qfrontier.append(source)
+    mark[source] = base
+    link[source] = None
+    reached = 1
+    while qfrontier:
+        person = qfrontier.popleft()
+        for movie, neighbor in neighbors(person):
+            if mark[neighbor] != base:
+                mark[neighbor] = base
+                link[neighbor] = (person, movie)
+                reached += 1
+                if neighbor == target:
+                    space.reached = reached
+                    return path_to(link, target)
+                qfrontier.append(neighbor)
+    space.reached = reached
+    return None
+
+
+def astar(source, target, neighbors, heuristic, space=None):
+    """
+    A* search from `source` to `target` with unit-cost edges, where
+    `heuristic(person)` is a consistent lower bound on the number of
+    hops from `person` to `target`, or None if `person` cannot reach it
+    at all (so it is never queued).
+
+    Returns the same path format as bfs, or None.
+    """
+    if source == target:
+        return []
+    if space is None:
+        space = SearchSpace()
+    else:
+        space.reset()
+    pparent = space.sparent
+    cost = space.sdist
+    heap = space.heap
+    estimate = heuristic(source)
+    if estimate is None:
+        return None
+    pparent[source] = None
+    cost[source] = 0
+
+    # Ties on the estimate go to the deeper person, which is closer
+    # to the target
+    heap.append((estimate, 0, source))
+    while heap:
+        _, negative, person = heapq.heappop(heap)
+        if -negative > cost[person]:
+            continue
+        if person == target:
+            return path_to(pparent, target)
+        hops = cost[person] + 1
+        for movie, neighbor in neighbors(person):
+            if neighbor in cost and cost[neighbor] <= hops:
+                continue
+            estimate = heuristic(neighbor)
+            if estimate is None:
+                continue
+            pparent[neighbor] = (person, movie)
+            cost[neighbor] = hops
+            heapq.heappush(heap, (hops + estimate, -hops, neighbor))
+    return None
+
+
+def bfs_tree(source, neighbors, targets=None, space=None):
+    """
+    Breadth-first search outward from `source`, stopping early once
+    every person in `targets` has been reached (or when everything
+    reachable has been, if `targets` is None).
+
+    Returns (pparent, dist): the BFS tree as person -> (parent, movie)
+    links and the number of hops to each person reached.
+    """
+    if space is None:
+        space = SearchSpace()
+    else:
+        space.reset()
+    qfrontier = space.sfrontier
+    pparent = space.sparent
+    dist = space.sdist
+    remaining = set(targets) - {source} if targets is not None else None
+    qfrontier.append(source)
+    pparent[source] = None
+    dist[source] = 0
+    while qfrontier and (remaining is None or remaining):
+        person = qfrontier.popleft()
+        for movie, neighbor in neighbors(person):
+            if neighbor not in pparent:
+                pparent[neighbor] = (person, movie)
+                dist[neighbor] = dist[person] + 1
+                qfrontier.append(neighbor)
+                if remaining is not None:
+                    remaining.discard(neighbor)
+    return pparent, dist
+
+
+def shortest_path_dag(source, target, neighbors):
+    """
+    Find every shortest path from `source` to `target` at once.
+
+    Searches breadth-first from both ends, expanding the smaller
+    frontier one whole layer at a time and remembering every way each
+    person was reached in the fewest hops, until the two sides meet.
+
+    Returns a dict mapping each person on some shortest path to its
+    (parent, movie) predecessors on those paths, one hop closer to the
+    source, or None if `target` cannot be reached.
+    """
+    if source == target:
+        return {source: []}
+    # preds: person -> every (person one hop closer to that side, movie)
+    spreds = {source: []}
+    tpreds = {target: []}
+    sfrontier = [source]
+    tfrontier = [target]
+    meet = []
+    while sfrontier and tfrontier and not meet:
+        if len(sfrontier) <= len(tfrontier):
+            sfrontier = expand_layer(sfrontier, spreds, neighbors)
+            meet = [person for person in sfrontier if person in tpreds]
+        else:
+            tfrontier = expand_layer(tfrontier, tpreds, neighbors)
+            meet = [person for person in tfrontier if person in spreds]
+    if not meet:
+        return None
+
+    # Every shortest path crosses the layer just found at one of the
+    # meeting people: keep their ancestors on the source side, and
+    # re-point the target side's links so they face the source
+    dag = {}
+    stack = list(meet)
+    while stack:
+        person = stack.pop()
+        if person in dag:
+            continue
+        dag[person] = spreds[person]
+        stack.extend(parent for parent, _ in spreds[person])
+    layer = meet
+    while layer:
+        following = {}
+        for person in layer:
+            for child, movie in tpreds[person]:
+                if child not in following:
+                    following[child] = dag[child] = []
+                dag[child].append((person, movie))
+        layer = list(following)
+    return dag
+
+
+def expand_layer(frontier, preds, neighbors):
+    """
+    Discover the layer after `frontier`, adding to `preds` every link
+    from the frontier into it, and return the new layer.
+    """
+    layer = {}
+    for person in frontier:
+        for movie, neighbor in neighbors(person):
+            if neighbor in layer:
+                layer[neighbor].append((person, movie))
+            elif neighbor not in preds:
+                layer[neighbor] = [(person, movie)]
+    preds.update(layer)
+    return list(layer)
+
+
+def all_shortest_paths(source, target, neighbors):
+    """
+    Yield every shortest path from `source` to `target`, each in the
+    same format as bfs, one at a time. Only the layered graph of
+    shortest paths is kept in memory, never the set of paths.
+    """
+    dag = shortest_path_dag(source, target, neighbors)
+    if dag is None:
+        return
+    if source == target:
+        yield []
+        return
+
+    # Depth-first walk back from the target, one predecessor iterator
+    # per hop of the current partial path
+    spath = []
+    stack = [iter(dag[target])]
+    person = target
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            if spath:
+                _, person = spath.pop()
+            continue
+        parent, movie = step
+        if parent == source:
+            yield [(movie, person)] + spath[::-1]
+            continue
+        spath.append((movie, person))
+        person = parent
+        stack.append(iter(dag[person]))
+
+
+def ranked_shortest_paths(source, target, neighbors, score):
+    """
+    Yield the shortest paths from `source` to `target` in decreasing
+    order of the total `score(movie)` of the movies along them.
+
+    Each person's best achievable score from the source is computed
+    once over the shortest-path graph, so partial paths are extended
+    best-first and complete paths come out in exact order without
+    enumerating the rest.
+    """
+    dag = shortest_path_dag(source, target, neighbors)
+    if dag is None:
+        return
+    if source == target:
+        yield []
+        return
+
+    # best[person]: highest score of any shortest path source -> person
+    best = {source: 0}
+
+    def best_to(person):
+        stack = [person]
+        while stack:
+            current = stack[-1]
+            pending = [p for p, _ in dag[current] if p not in best]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if current not in best:
+                best[current] = max(
+                    best[parent] + score(movie)
+                    for parent, movie in dag[current]
+                )
+        return best[person]
+
+    best_to(target)
+
+    # Extend partial paths backwards from the target; the priority is
+    # the exact best total still reachable, so pops are in order
+    counter = itertools.count()
+    heap = [(-best[target], next(counter), target, 0, ())]
+    while heap:
+        _, _, person, suffix_score, suffix = heapq.heappop(heap)
+        if person == source:
+            yield list(suffix)
+            continue
+        for parent, movie in dag[person]:
+            total = suffix_score + score(movie)
+            heapq.heappush(heap, (
+                -(best[parent] + total), next(counter), parent, total,
+                ((movie, person),) + suffix
+            ))
+
+
+def k_shortest_paths(source, target, neighbors, k, space=None):
+    """
+    Yield up to `k` simple paths from `source` to `target` in order of
+    increasing length (Yen's algorithm), each in the same format as
+    bfs. Paths are found one at a time, so stopping early does no
+    extra work; every search made along the way uses `space`.
+    """
+    if space is None:
+        space = SearchSpace()
+    first = bidirectional_bfs(source, target, neighbors, space)
+    if first is None:
+        return
+    found = [first]
+    yield first
+    candidates = []
+    queued = {tuple(first)}
+    counter = itertools.count()
+    while len(found) < k:
+        previous = found[-1]
+        people = [source] + [person for _, person in previous]
+        for i in range(len(previous)):
+            # Detour from the i-th person of the last path found, off
+            # every link already taken from there after the same start
+            spur = people[i]
+            root = previous[:i]
+            removed_people = set(people[:i])
+            removed_links = set()
+            for path in found:
+                if path[:i] == root:
+                    movie, person = path[i]
+                    removed_links.add((spur, movie, person))
+                    removed_links.add((person, movie, spur))
+
+            def allowed(person):
+                if person in removed_people:
+                    return
+                for movie, neighbor in neighbors(person):
+                    if (neighbor not in removed_people and
+                            (person, movie, neighbor) not in removed_links):
+                        yield movie, neighbor
+
+            detour = bidirectional_bfs(spur, target, allowed, space)
+            if detour is None:
+                continue
+            path = root + detour
+            if tuple(path) not in queued:
+                queued.add(tuple(path))
+                heapq.heappush(candidates, (len(path), next(counter), path))
+        if not candidates:
+            return
+        _, _, path = heapq.heappop(candidates)
+        found.append(path)
+        yield path
+
+
+def instrument(neighbors, space, stats):
+    """
+    Wrap `neighbors` so that every call made by a search using `space`
+    adds to `stats`: people expanded, (movie, person) pairs produced
+    and the peak number of people waiting in the frontiers.
+    """
+    stats.setdefault("expanded", 0)
+    stats.setdefault("neighbor_pairs", 0)
+    stats.setdefault("frontier_peak", 0)
+
+    def counted(person):
+        stats["expanded"] += 1
+        waiting = (len(space.sfrontier) + len(space.tfrontier) +
+                   len(space.heap))
+        if waiting > stats["frontier_peak"]:
+            stats["frontier_peak"] = waiting
+        pairs = 0
+        try:
+            for pair in neighbors(person):
+                pairs += 1
+                yield pair
+        finally:
+            # Searches may stop partway through a person's neighbors
+            stats["neighbor_pairs"] += pairs
+
+    return counted
+
+
+def path_to(pparent, target):
+    """
+    Follow `pparent` links (person -> (parent, movie)) back from
+    `target` and return the path as (movie, person) pairs.
+    """
+    spath = []
+    person = target
+    while pparent[person] is not None:
+        parent, movie = pparent[person]
+        spath.append((movie, person))
+        person = parent
+    spath.reverse()
+    return spath
+
@@ -0,0 +1,139 @@
+import io
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+from batch import answer, run_batch
+
+HOST = "127.0.0.1"
+PORT = 8050
+
+
+def main():
+    if (len(sys.argv) > 4 or
+            (len(sys.argv) == 4 and sys.argv[3] != "landmarks") or
+            (len(sys.argv) >= 3 and not valid_port(sys.argv[2]))):
+        sys.exit("Usage: python server.py [directory] [port] [landmarks]")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    port = int(sys.argv[2]) if len(sys.argv) >= 3 else PORT
+    k = degrees.LANDMARKS if len(sys.argv) == 4 else 0
+
+    print("Loading data...")
+    degrees.load_data(directory, "compact", k=k)
+    print("Data loaded.")
+
+    # Requests are handled one at a time, so they can share one
+    # SearchSpace along with the loaded graph
+    server = HTTPServer((HOST, port), DegreesHandler)
+    server.space = degrees.search_space()
+    print(f"Serving on http://{HOST}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def valid_port(port):
+    """
+    Return whether the string `port` is a TCP port number to listen on.
+    """
+    return port.isdigit() and 0 < int(port) < 65536
+
+
+def mode_error(mode):
+    """
+    Return why search mode `mode` cannot be used with the loaded data,
+    or None if it can.
+    """
+    if mode not in degrees.MODES:
+        return f"unknown mode {mode}"
+    if mode == "landmarks" and degrees.landmarks is None:
+        return "the server was started without landmarks"
+    return None
+
+
+class DegreesHandler(BaseHTTPRequestHandler):
+    """
+    GET /path?source=...&target=...[&mode=...] answers one pair as JSON.
+    GET /names?prefix=... or /names?q=...[&limit=...] lists people whose
+    names complete the prefix or are close to q, for autocomplete.
+    POST /batch[?mode=...] answers a body of pairs (one per line, in
+    the batch.py input format) as JSON lines.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/names":
+            return self.send_names(query)
+        if url.path != "/path":
+            return self.send_error(404)
+        if "source" not in query or "target" not in query:
+            return self.send_error(400, "source and target are required")
+        mode = query.get("mode", ["bidirectional"])[0]
+        if mode_error(mode):
+            return self.send_error(400, mode_error(mode))
+        result = answer(
+            query["source"][0], query["target"][0], mode, self.server.space
+        )
+        self.send_body(json.dumps(result) + "\n", "application/json")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/batch":
+            return self.send_error(404)
+        mode = parse_qs(url.query).get("mode", ["bidirectional"])[0]
+        if mode_error(mode):
+            return self.send_error(400, mode_error(mode))
+        # UnicodeDecodeError is a ValueError too
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError("negative Content-Length")
+            lines = io.StringIO(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            return self.send_error(400, "bad Content-Length or body")
+        out = io.StringIO()
+        run_batch(lines, out, mode, self.server.space)
+        self.send_body(out.getvalue(), "application/x-ndjson")
+
+    def send_names(self, query):
+        try:
+            limit = int(query.get("limit", ["10"])[0])
+        except ValueError:
+            return self.send_error(400, "limit must be a number")
+        if limit < 0:
+            return self.send_error(400, "limit must not be negative")
+        if "prefix" in query:
+            person_ids = degrees.complete_name(query["prefix"][0], limit)
+            matches = [{"person_id": person_id} for person_id in person_ids]
+        elif "q" in query:
+            matches = [
+                {"person_id": person_id, "distance": distance}
+                for person_id, distance in degrees.similar_names(
+                    query["q"][0], limit
+                )
+            ]
+        else:
+            return self.send_error(400, "prefix or q is required")
+        for match in matches:
+            person = degrees.people[match["person_id"]]
+            match["name"] = person["name"]
+            match["birth"] = person["birth"]
+        self.send_body(json.dumps(matches) + "\n", "application/json")
+
+    def send_body(self, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+if __name__ == "__main__":
+    main()
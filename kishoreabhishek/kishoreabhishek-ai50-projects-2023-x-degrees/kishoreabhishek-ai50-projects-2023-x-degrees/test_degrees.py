@@ -0,0 +1,617 @@
+import http.client
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+
+import pytest
+
+import batch
+import benchmark
+import degrees
+import landmarks
+import nameindex
+import parallel
+import search
+import server
+from graph import SNAPSHOT_NAME, cache_files, replace_file
+from search import SearchSpace
+from util import Node, PriorityFrontier, QueueFrontier, StackFrontier
+
+PEOPLE = [
+    ("102", "Kevin Bacon", "1958"),
+    ("129", "Tom Cruise", "1962"),
+    ("144", "Cary Elwes", "1962"),
+    ("158", "Tom Hanks", "1956"),
+    ("1597", "Mandy Patinkin", "1952"),
+    ("163", "Dustin Hoffman", "1937"),
+    ("1697", "Chris Sarandon", "1942"),
+    ("193", "Demi Moore", "1962"),
+    ("197", "Jack Nicholson", "1937"),
+    ("200", "Bill Paxton", "1955"),
+    ("398", "Sally Field", "1946"),
+    ("420", "Valeria Golino", "1965"),
+    ("596520", "Gerald R. Molen", "1935"),
+    ("641", "Gary Sinise", "1955"),
+    ("705", "Robin Wright", "1966"),
+    ("914612", "Emma Watson", "1990"),
+]
+
+MOVIES = [
+    ("104257", "A Few Good Men", "1992"),
+    ("109830", "Forrest Gump", "1994"),
+    ("93779", "The Princess Bride", "1987"),
+    ("95953", "Rain Man", "1988"),
+    ("112384", "Apollo 13", "1995"),
+]
+
+STARS = [
+    ("102", "104257"), ("102", "112384"), ("129", "104257"),
+    ("129", "95953"), ("144", "93779"), ("158", "109830"),
+    ("158", "112384"), ("1597", "93779"), ("163", "95953"),
+    ("1697", "93779"), ("193", "104257"), ("197", "104257"),
+    ("200", "112384"), ("398", "109830"), ("420", "95953"),
+    ("596520", "95953"), ("641", "109830"), ("641", "112384"),
+    ("705", "109830"), ("705", "93779"),
+]
+
+
+@pytest.fixture
+def small(tmp_path, monkeypatch):
+    """
+    Writes the small CS50 data set to a directory and returns it,
+    caching snapshots in a "cache" directory beside it.
+    """
+    monkeypatch.setenv("DEGREES_CACHE", str(tmp_path / "cache"))
+    tmp_path = tmp_path / "data"
+    tmp_path.mkdir()
+    tables = {
+        "people.csv": ("id,name,birth", PEOPLE),
+        "movies.csv": ("id,title,year", MOVIES),
+        "stars.csv": ("person_id,movie_id", STARS),
+    }
+    for filename, (header, rows) in tables.items():
+        lines = [header] + [",".join(row) for row in rows]
+        (tmp_path / filename).write_text("\n".join(lines) + "\n")
+    return str(tmp_path)
+
+
+def run_main(monkeypatch, capsys, argv, answers):
+    """
+    Runs degrees.main with `argv` and `answers` typed at its prompts,
+    and returns what it printed.
+    """
+    monkeypatch.setattr(sys, "argv", ["degrees.py"] + argv)
+    monkeypatch.setattr(sys, "stdin", io.StringIO("\n".join(answers) + "\n"))
+    degrees.main()
+    return capsys.readouterr().out
+
+
+@pytest.mark.parametrize("backend", degrees.BACKENDS)
+def test_main_finds_path(monkeypatch, capsys, small, backend):
+    out = run_main(monkeypatch, capsys, [small, backend],
+                   ["Kevin Bacon", "Robin Wright"])
+    assert "2 degrees of separation." in out
+    assert "1: Kevin Bacon and " in out
+    assert " and Robin Wright starred in " in out
+
+
+def test_main_suggests_similar_names(monkeypatch, capsys, small):
+    out = run_main(monkeypatch, capsys, [small],
+                   ["Kevin Bacn", "102", "Tom Hanks"])
+    assert "No 'Kevin Bacn'. Did you mean:" in out
+    assert "1 degrees of separation." in out
+    assert "Kevin Bacon and Tom Hanks starred in Apollo 13" in out
+
+
+@pytest.mark.parametrize("backend", degrees.BACKENDS)
+def test_complete_name_order_and_limit(small, backend):
+    degrees.load_data(small, backend)
+    assert degrees.complete_name("t") == ["129", "158"]
+    assert degrees.complete_name("TOM ", limit=1) == ["129"]
+    assert degrees.complete_name("c") == ["144", "1697"]
+    assert degrees.complete_name("x") == []
+
+
+@pytest.mark.parametrize("backend", degrees.BACKENDS)
+def test_similar_names_finds_one_edit_misspelling(small, backend):
+    degrees.load_data(small, backend)
+    assert degrees.similar_names("Tom Hnks")[0] == ("158", 1)
+    assert degrees.similar_names("kevin bacom", limit=1) == [("102", 1)]
+    assert degrees.similar_names("Nobody At All") == []
+
+
+def test_name_index_normalizes_case_and_accents():
+    index = nameindex.NameIndex.build([
+        ("Zoë  Saldaña", 1), ("ZOE SALDANA", 2), ("Zoe Kravitz", 3)
+    ])
+    assert index.exact("zoe saldana") == [1, 2]
+    assert index.prefix("ZOË s") == [("zoe saldana", [1, 2])]
+    assert index.fuzzy("Zoé Saldano") == [("zoe saldana", [1, 2], 1)]
+
+
+def test_fuzzy_checks_at_most_fuzzy_candidates(monkeypatch):
+    index = nameindex.NameIndex.build(
+        [("anna smith", 0)] +
+        [(f"anna smith {i}", i + 1) for i in range(50)]
+    )
+    checked = []
+
+    def edit_distance(a, b, limit):
+        checked.append(b)
+        return original(a, b, limit)
+
+    original = nameindex.edit_distance
+    monkeypatch.setattr(nameindex, "edit_distance", edit_distance)
+    monkeypatch.setattr(nameindex, "FUZZY_CANDIDATES", 3)
+    assert index.fuzzy("anna smyth", limit=2)[0] == ("anna smith", [0], 1)
+    assert len(checked) <= 2 * 3
+
+
+def test_main_person_not_found(monkeypatch, capsys, small):
+    with pytest.raises(SystemExit, match="Person not found."):
+        run_main(monkeypatch, capsys, [small], ["Nobody At All", ""])
+
+
+def test_batch_landmarks_mode(monkeypatch, capsys, small, tmp_path):
+    pairs = tmp_path / "pairs.jsonl"
+    pairs.write_text('{"source": "Kevin Bacon", "target": "Tom Hanks"}\n')
+    monkeypatch.setattr(
+        sys, "argv", ["batch.py", small, str(pairs), "landmarks"]
+    )
+    batch.main()
+    result = json.loads(capsys.readouterr().out)
+    assert result["degrees"] == 1
+
+
+@pytest.mark.parametrize("backend", degrees.BACKENDS)
+def test_shortest_path_stats(small, backend):
+    # Kevin Bacon's and Robin Wright's two movies each have four stars,
+    # themselves included, and the searches meet at Tom Hanks or Gary
+    # Sinise once both of them have been expanded
+    degrees.load_data(small, backend)
+    stats = {}
+    path = degrees.shortest_path("102", "705", "bidirectional", stats=stats)
+    assert len(path) == 2
+    assert stats["expanded"] == 2
+    assert stats["neighbor_pairs"] == 16
+    # Kevin Bacon's six co-stars wait while Robin Wright is expanded
+    assert stats["frontier_peak"] == 6
+    assert stats["visited"] == 14
+    assert stats["neighbor_sets"] == (2 if backend == "dict" else 0)
+    assert stats["search_seconds"] >= 0 and stats["translate_seconds"] >= 0
+
+
+def test_instrument_counts_partial_expansions():
+    space = SearchSpace()
+    space.sfrontier.extend([1, 2, 3])
+    stats = {}
+    counted = search.instrument(
+        lambda person: iter([("m", person + 1), ("m", person + 2)]),
+        space, stats
+    )
+    assert list(counted(1)) == [("m", 2), ("m", 3)]
+    # A search that stops after the first neighbor still counts it
+    partial = counted(5)
+    next(partial)
+    partial.close()
+    assert stats == {"expanded": 2, "neighbor_pairs": 3, "frontier_peak": 3}
+
+
+def test_benchmark_leaves_no_cache(monkeypatch, capsys, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    monkeypatch.delenv("DEGREES_CACHE", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+    monkeypatch.setattr(benchmark, "QUERIES", 5)
+    monkeypatch.setattr(sys, "argv", ["benchmark.py", "300,200"])
+    benchmark.main()
+    results = json.loads(capsys.readouterr().out)["results"]
+    assert results[0]["people"] == 300
+    assert "compact/bidirectional" in results[0]["queries"]
+    assert not (tmp_path / "xdg").exists()
+    assert os.listdir(tmp_path / "tmp") == []
+    assert "DEGREES_CACHE" not in os.environ
+
+
+@pytest.mark.parametrize("port", ["http", "-1", "0", "70000", "80.5"])
+def test_server_rejects_bad_port(monkeypatch, small, port):
+    monkeypatch.setattr(sys, "argv", ["server.py", small, port])
+    with pytest.raises(SystemExit, match="Usage:"):
+        server.main()
+
+
+def test_server_rejects_landmarks_without_index(small):
+    degrees.load_data(small, "compact")
+    assert server.mode_error("bfs") is None
+    assert server.mode_error("landmarks")
+    assert server.mode_error("nonsense")
+    degrees.load_data(small, "compact", k=2)
+    assert server.mode_error("landmarks") is None
+
+
+def test_batch_reports_bad_pairs(small):
+    degrees.load_data(small, "compact")
+    lines = [
+        '{"source": 102, "target": "Tom Hanks"}\n',
+        '{"source": "Kevin Bacon"}\n',
+        '{"source": \n',
+        "Kevin Bacon\tTom Hanks\n",
+    ]
+    out = io.StringIO()
+    batch.run_batch(lines, out)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [result.get("error") for result in results] == [
+        "Bad pair.", "Bad pair.", "Bad pair.", None
+    ]
+    assert results[3]["degrees"] == 1
+
+
+@pytest.fixture
+def served(small):
+    """
+    Serves the small data set on a free port and returns a function
+    making one request to it, which returns (status, body).
+    """
+    degrees.load_data(small, "compact")
+    httpd = server.HTTPServer(("127.0.0.1", 0), server.DegreesHandler)
+    httpd.space = degrees.search_space()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    def request(method, url, body=None, headers=None):
+        connection = http.client.HTTPConnection(*httpd.server_address)
+        connection.putrequest(method, url)
+        for name, value in (headers or {}).items():
+            connection.putheader(name, value)
+        connection.endheaders()
+        if body is not None:
+            connection.send(body)
+        response = connection.getresponse()
+        result = response.status, response.read()
+        connection.close()
+        return result
+
+    yield request
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_server_answers_pairs(served):
+    status, body = served("GET", "/path?source=102&target=158")
+    assert status == 200
+    assert json.loads(body)["degrees"] == 1
+    pairs = b"Kevin Bacon\tTom Hanks\n"
+    status, body = served("POST", "/batch", pairs,
+                          {"Content-Length": str(len(pairs))})
+    assert status == 200
+    assert json.loads(body)["degrees"] == 1
+
+
+@pytest.mark.parametrize("method, url, body, headers", [
+    ("POST", "/batch", b"", {"Content-Length": "many"}),
+    ("POST", "/batch", b"\xff\xfe\n", {"Content-Length": "3"}),
+    ("GET", "/names?prefix=Kev&limit=ten", None, None),
+    ("GET", "/path?source=102&target=158&mode=landmarks", None, None),
+])
+def test_server_rejects_bad_requests(served, method, url, body, headers):
+    status, _ = served(method, url, body, headers)
+    assert status == 400
+
+
+def test_views_load_details_only_when_read(small):
+    degrees.load_data(small, "compact", snapshot=False, details=False)
+    assert "102" in degrees.people
+    assert "999" not in degrees.people
+    assert "112384" in degrees.movies
+    assert degrees.person_ids_for("102") == ["102"]
+    assert degrees.people["102"]["name"] == "Kevin Bacon"
+    assert degrees.movies["112384"]["stars"] == {"102", "158", "200", "641"}
+    assert degrees.graph.details is not None
+    assert degrees.people["102"]["birth"] == "1958"
+    assert degrees.graph.details is None
+    assert degrees.movies["112384"]["title"] == "Apollo 13"
+
+
+def test_snapshot_is_cached_outside_the_data(small):
+    degrees.load_data(small, "compact", k=2)
+    assert sorted(os.listdir(small)) == [
+        "movies.csv", "people.csv", "stars.csv"
+    ]
+    cached = cache_files(small, SNAPSHOT_NAME)[0]
+    assert os.path.exists(cached)
+    degrees.load_data(small, "compact")
+    assert degrees.load_stats["snapshot"] == cached
+
+
+def test_failed_replace_leaves_no_temporary_file(tmp_path):
+    def write(f):
+        f.write(b"partial")
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        replace_file(str(tmp_path / "out"), write)
+    assert os.listdir(tmp_path) == []
+
+
+def test_unwritable_cache_falls_back_to_temporary_directory(
+        small, tmp_path, monkeypatch):
+    blocked = tmp_path / "blocked"
+    blocked.write_text("not a directory")
+    monkeypatch.setenv("DEGREES_CACHE", str(blocked))
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "temporary"))
+    degrees.load_data(small, "compact")
+    degrees.load_data(small, "compact")
+    assert degrees.load_stats["snapshot"] == cache_files(
+        small, SNAPSHOT_NAME
+    )[1]
+
+
+def test_uncachable_snapshot_warns(small, tmp_path, monkeypatch, capsys):
+    blocked = tmp_path / "blocked"
+    blocked.write_text("not a directory")
+    monkeypatch.setenv("DEGREES_CACHE", str(blocked))
+    monkeypatch.setattr(tempfile, "tempdir", str(blocked))
+    degrees.load_data(small, "compact")
+    assert "could not cache" in capsys.readouterr().err
+    assert degrees.people["102"]["name"] == "Kevin Bacon"
+
+
+def test_bfs_tree_stops_at_targets(small):
+    degrees.load_data(small)
+    pparent, dist = search.bfs_tree(
+        "102", degrees.neighbors_for_person, ["158"]
+    )
+    assert dist["158"] == 1
+    assert "705" not in dist
+    assert degrees.distances_from("102")["705"] == 2
+
+
+@pytest.mark.parametrize("backend", degrees.BACKENDS)
+def test_paths_from_maps_unknown_targets_to_none(small, backend):
+    degrees.load_data(small, backend)
+    paths = degrees.paths_from("102", ["705", "914612", "999"])
+    assert len(paths["705"]) == 2
+    check_path("102", "705", paths["705"])
+    assert paths["914612"] is None
+    assert paths["999"] is None
+
+
+def test_parallel_matches_serial(small, monkeypatch):
+    ids = [person_id for person_id, _, _ in PEOPLE]
+    pairs = [
+        (source, target)
+        for i, source in enumerate(ids) for target in ids[i + 1:]
+    ]
+    results = list(parallel.parallel_shortest_paths(small, pairs, 2))
+    assert sorted((s, t) for s, t, _ in results) == sorted(pairs)
+
+    # Answer one group from a BFS tree in this process as well
+    monkeypatch.setattr(parallel, "TREE_TARGETS", 2)
+    parallel.start_worker(small)
+    results += parallel.answer_group(("102", ids[1:]))
+    for source, target, path in results:
+        expected = degrees.shortest_path(source, target, "bidirectional")
+        if expected is None:
+            assert path is None
+            continue
+        assert len(path) == len(expected)
+        check_path(source, target, path)
+
+
+@pytest.fixture(scope="module")
+def synthetic(tmp_path_factory):
+    """
+    Writes a seeded synthetic data set with a few hundred people to a
+    directory and returns it with 40 random pairs of person_ids.
+    """
+    directory = str(tmp_path_factory.mktemp("synthetic"))
+    benchmark.generate(directory, 400, 250, 3, 2.0, 7)
+    rng = random.Random(7)
+    ids = [str(i + 1) for i in range(400)]
+    return directory, [(rng.choice(ids), rng.choice(ids)) for _ in range(40)]
+
+
+def check_path(source, target, path):
+    """
+    Asserts that `path` leads from `source` to `target` through movies
+    both people at each step starred in.
+    """
+    person = source
+    for movie_id, person_id in path:
+        assert person in degrees.movies[movie_id]["stars"]
+        assert person_id in degrees.movies[movie_id]["stars"]
+        person = person_id
+    assert person == target
+
+
+@pytest.mark.parametrize("backend", degrees.BACKENDS)
+def test_bidirectional_matches_bfs(synthetic, monkeypatch, tmp_path,
+                                   backend):
+    monkeypatch.setenv("DEGREES_CACHE", str(tmp_path))
+    directory, pairs = synthetic
+    degrees.load_data(directory, backend)
+    space = degrees.search_space()
+    for source, target in pairs:
+        expected = degrees.shortest_path(source, target, "bfs")
+        path = degrees.shortest_path(source, target, "bidirectional", space)
+        if expected is None:
+            assert path is None
+            continue
+        assert len(path) == len(expected)
+        check_path(source, target, path)
+
+
+@pytest.mark.parametrize("mode", ["bfs", "bidirectional"])
+def test_reused_space_matches_fresh_searches(synthetic, monkeypatch,
+                                             tmp_path, mode):
+    monkeypatch.setenv("DEGREES_CACHE", str(tmp_path))
+    directory, pairs = synthetic
+    degrees.load_data(directory, "compact")
+    space = degrees.search_space()
+    assert space.size == len(degrees.graph.person_ids)
+    for source, target in pairs + pairs[::-1]:
+        fresh, reused = {}, {}
+        expected = degrees.shortest_path(source, target, mode,
+                                         SearchSpace(), fresh)
+        path = degrees.shortest_path(source, target, mode, space, reused)
+        assert path == expected
+        for name in ("expanded", "neighbor_pairs", "frontier_peak",
+                     "visited"):
+            assert reused[name] == fresh[name]
+        if mode == "bfs":
+            assert not space.sparent
+
+
+def test_landmarks_match_bfs(synthetic, monkeypatch, tmp_path):
+    monkeypatch.setenv("DEGREES_CACHE", str(tmp_path))
+    directory, pairs = synthetic
+    degrees.load_data(directory, "compact", k=4)
+    for source, target in pairs:
+        expected = degrees.shortest_path(source, target, "bfs")
+        path = degrees.shortest_path(source, target, "landmarks")
+        lower, upper = degrees.separation_bounds(source, target)
+        if expected is None:
+            assert path is None
+            continue
+        assert len(path) == len(expected)
+        check_path(source, target, path)
+        assert lower <= len(expected)
+        assert upper is None or len(expected) <= upper
+
+
+def test_landmarks_beyond_far(tmp_path, monkeypatch):
+    # A hub of co-stars (the landmark) at one end of a long chain
+    monkeypatch.setenv("DEGREES_CACHE", str(tmp_path / "cache"))
+    length = landmarks.FAR + 20
+    people = ["id,name,birth"] + [
+        f"{i},Person {i}," for i in range(length + 10)
+    ]
+    movies = ["id,title,year"] + [
+        f"{i},Movie {i}," for i in range(length + 1)
+    ]
+    stars = ["person_id,movie_id"] + [
+        f"{i},{i}\n{i + 1},{i}" for i in range(length)
+    ] + [f"0,{length}"] + [
+        f"{i},{length}" for i in range(length + 1, length + 10)
+    ]
+    for filename, lines in (("people.csv", people), ("movies.csv", movies),
+                            ("stars.csv", stars)):
+        (tmp_path / filename).write_text("\n".join(lines) + "\n")
+    degrees.load_data(str(tmp_path), "compact", k=1)
+
+    source = str(length + 1)
+    for target in ("1", str(length - 30), str(length - 1), str(length)):
+        expected = degrees.shortest_path(source, target, "bfs")
+        lower, upper = degrees.separation_bounds(source, target)
+        assert lower <= len(expected)
+        assert upper is None or len(expected) <= upper
+        path = degrees.shortest_path(source, target, "landmarks")
+        assert len(path) == len(expected)
+    assert degrees.separation_bounds(source, str(length))[1] is None
+
+
+def count_shortest_paths(source, target):
+    """
+    Returns how many shortest paths lead from `source` to `target`,
+    counting paths through different movies separately.
+    """
+    dist = degrees.distances_from(source)
+    if target not in dist:
+        return 0
+    counts = {source: 1}
+    layer = [source]
+    while target not in counts:
+        following = {}
+        for person in layer:
+            for _, neighbor in degrees.neighbors_for_person(person):
+                if dist[neighbor] == dist[person] + 1:
+                    following[neighbor] = (
+                        following.get(neighbor, 0) + counts[person]
+                    )
+        counts.update(following)
+        layer = list(following)
+    return counts[target]
+
+
+@pytest.mark.parametrize("backend", degrees.BACKENDS)
+def test_path_enumeration(synthetic, monkeypatch, tmp_path, backend):
+    monkeypatch.setenv("DEGREES_CACHE", str(tmp_path))
+    directory, pairs = synthetic
+    degrees.load_data(directory, backend)
+    score = degrees.movie_score("popularity")
+    for source, target in pairs[:15]:
+        expected = degrees.shortest_path(source, target, "bfs")
+        paths = list(degrees.shortest_paths(source, target))
+        assert len(paths) == count_shortest_paths(source, target)
+        assert len({tuple(path) for path in paths}) == len(paths)
+        for path in paths:
+            assert len(path) == len(expected)
+            check_path(source, target, path)
+
+        ranked = list(degrees.shortest_paths(source, target, "popularity"))
+        assert sorted(map(tuple, ranked)) == sorted(map(tuple, paths))
+        totals = [
+            sum(score(movie_id if degrees.graph is None
+                      else degrees.graph.movie(movie_id))
+                for movie_id, _ in path)
+            for path in ranked
+        ]
+        assert totals == sorted(totals, reverse=True)
+
+        simple = list(degrees.simple_paths(source, target, 5))
+        if expected is None:
+            assert simple == []
+            continue
+        assert len(simple[0]) == len(expected)
+        assert [len(path) for path in simple] == sorted(map(len, simple))
+        assert len({tuple(path) for path in simple}) == len(simple)
+        for path in simple:
+            check_path(source, target, path)
+            visited = [source] + [person_id for _, person_id in path]
+            assert len(set(visited)) == len(visited)
+
+
+@pytest.mark.parametrize("frontier", [StackFrontier, QueueFrontier,
+                                      PriorityFrontier])
+def test_frontier_tracks_states(frontier):
+    frontier = frontier()
+    assert frontier.empty()
+    for state in ("a", "b", "a"):
+        frontier.add(Node(state, None, None))
+    assert frontier.states == {"a": 2, "b": 1}
+    assert frontier.contains_state("a") and frontier.contains_state("b")
+    assert not frontier.contains_state("c")
+
+    removed = [frontier.remove().state for _ in range(3)]
+    assert sorted(removed) == ["a", "a", "b"]
+    # A state stays in the frontier until its last copy is removed
+    assert frontier.states == {}
+    assert not frontier.contains_state("a")
+    assert frontier.empty()
+    with pytest.raises(Exception, match="empty frontier"):
+        frontier.remove()
+
+
+def test_stack_and_queue_frontier_order():
+    stack, queue = StackFrontier(), QueueFrontier()
+    for state in range(5):
+        stack.add(Node(state, None, None))
+        queue.add(Node(state, None, None))
+    assert [stack.remove().state for _ in range(5)] == [4, 3, 2, 1, 0]
+    assert [queue.remove().state for _ in range(5)] == [0, 1, 2, 3, 4]
+
+
+def test_priority_frontier_order():
+    frontier = PriorityFrontier()
+    for state, priority in [("c", 2), ("a", 1), ("d", 2), ("b", 1),
+                            ("e", 0), ("f", 2)]:
+        frontier.add(Node(state, None, None), priority)
+    assert frontier.contains_state("d")
+    # Lowest priority first, first in first out among equal priorities
+    assert [frontier.remove().state for _ in range(6)] == [
+        "e", "a", "b", "c", "d", "f"
+    ]
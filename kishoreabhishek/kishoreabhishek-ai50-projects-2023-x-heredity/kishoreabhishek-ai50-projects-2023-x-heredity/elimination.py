@@ -0,0 +1,210 @@
+import heapq
+import itertools
+import operator
+from functools import lru_cache
+
+# Number of copies of the gene a person can have
+GENES = (0, 1, 2)
+
+
+def marginals(people, probs):
+    """
+    Return the gene and trait distribution of every person in `people`
+    (as loaded by heredity.load_data), given the known traits, in the
+    same form as heredity computes by enumeration, using the model in
+    `probs` (laid out like heredity.PROBS).
+
+    Each person contributes one factor over their own gene count and
+    their parents', which already accounts for their trait. Gene
+    counts are eliminated one at a time, fewest neighbours first,
+    which turns the pedigree into a tree of small cliques; passing
+    messages up that tree and back down gives every person's
+    distribution at once, in time linear in the number of people for
+    pedigrees without many marriages between relatives.
+
+    Raises ValueError if the known traits are impossible.
+    """
+    inherit = inheritance(probs)
+    factors = {}
+    neighbors = {person: set() for person in people}
+    for person, data in people.items():
+        trait = data["trait"]
+        evidence = [
+            1 if trait is None else probs["trait"][genes][trait]
+            for genes in GENES
+        ]
+        if data["mother"] is None:
+            factors[person] = ((person,), [
+                probs["gene"][genes] * evidence[genes] for genes in GENES
+            ])
+            continue
+        family = (person, data["mother"], data["father"])
+        factors[person] = (family, [
+            inherit[mother][father][genes] * evidence[genes]
+            for genes, mother, father in itertools.product(GENES, repeat=3)
+        ])
+        # Parents of a child are connected too, as their genes are
+        # no longer independent once the child's are known
+        for a, b in itertools.permutations(family, 2):
+            neighbors[a].add(b)
+
+    order, cliques = eliminate(neighbors)
+    position = {person: i for i, person in enumerate(order)}
+
+    # Each clique hands its message on to the clique of the first of
+    # its other members to be eliminated, and holds the factors of the
+    # people whose family it is the first to eliminate
+    parent = {}
+    children = {person: [] for person in order}
+    for person in order:
+        rest = cliques[person][1:]
+        parent[person] = min(rest, key=position.get) if rest else None
+        if rest:
+            children[parent[person]].append(person)
+    held = {person: [] for person in order}
+    for person, factor in factors.items():
+        held[min(factor[0], key=position.get)].append(factor)
+
+    up = {}
+    for person in order:
+        if parent[person] is not None:
+            up[person] = product_sum(
+                held[person] + [up[child] for child in children[person]],
+                cliques[person][1:]
+            )
+    down = {}
+    for person in reversed(order):
+        above = parent[person]
+        if above is None:
+            continue
+        incoming = held[above] + [
+            up[child] for child in children[above] if child != person
+        ]
+        if above in down:
+            incoming.append(down[above])
+        down[person] = product_sum(incoming, cliques[person][1:])
+
+    probabilities = {}
+    for person, data in people.items():
+        incoming = held[person] + [up[child] for child in children[person]]
+        if person in down:
+            incoming.append(down[person])
+        _, gene = product_sum(incoming, (person,))
+        trait = [
+            sum(gene[genes] * probs["trait"][genes][value] for genes in GENES)
+            for value in (False, True)
+        ] if data["trait"] is None else [
+            float(data["trait"] is value) for value in (False, True)
+        ]
+        probabilities[person] = {
+            "gene": {genes: gene[genes] for genes in reversed(GENES)},
+            "trait": {True: trait[True], False: trait[False]}
+        }
+    return probabilities
+
+
+def inheritance(probs):
+    """
+    Return a table where `table[mother][father][child]` is the
+    probability of a child having `child` copies of the gene, given
+    their parents' gene counts, under the mutation rate in `probs`.
+    """
+    mutation = probs["mutation"]
+    # Probability of a parent passing the gene on, by their gene count
+    passing = [mutation, 0.5, 1 - mutation]
+    table = []
+    for mother in GENES:
+        table.append([])
+        for father in GENES:
+            m, f = passing[mother], passing[father]
+            table[mother].append([
+                (1 - m) * (1 - f),
+                m * (1 - f) + (1 - m) * f,
+                m * f
+            ])
+    return table
+
+
+def eliminate(neighbors):
+    """
+    Return (order, cliques) for eliminating every variable of the
+    graph given as a dict of neighbour sets, always eliminating a
+    variable with the fewest remaining neighbours next: the order, and
+    for each variable a tuple of itself followed by its neighbours
+    when it was eliminated. The neighbour sets are used up.
+    """
+    heap = [(len(others), i, person)
+            for i, (person, others) in enumerate(neighbors.items())]
+    heapq.heapify(heap)
+    tiebreak = len(heap)
+    order = []
+    cliques = {}
+    while heap:
+        degree, _, person = heapq.heappop(heap)
+        if person in cliques or degree != len(neighbors[person]):
+            continue
+        others = neighbors.pop(person)
+        order.append(person)
+        cliques[person] = (person,) + tuple(others)
+        for other in others:
+            links = neighbors[other]
+            links.discard(person)
+            links.update(others)
+            links.discard(other)
+            heapq.heappush(heap, (len(links), tiebreak, other))
+            tiebreak += 1
+    return order, cliques
+
+
+def product_sum(factors, scope):
+    """
+    Return the factor over the variables in `scope` obtained by
+    multiplying `factors` together and summing out every other
+    variable, scaled to add up to 1.
+
+    A factor is a (variables, values) pair, where `values` lists one
+    value per assignment of the variables in order, the last variable
+    changing fastest. Every variable takes a value from GENES.
+    """
+    variables = list(scope)
+    for factor_scope, _ in factors:
+        variables.extend(v for v in factor_scope if v not in variables)
+
+    # Every factor's values, lined up with the assignments of
+    # `variables` in order
+    product = None
+    for factor_scope, values in factors:
+        stride = {}
+        step = 1
+        for v in reversed(factor_scope):
+            stride[v] = step
+            step *= len(GENES)
+        index = entries(tuple(stride.get(v, 0) for v in variables))
+        lined = [values[i] for i in index]
+        product = lined if product is None else list(
+            map(operator.mul, product, lined)
+        )
+
+    if product is None:
+        product = [1.0] * len(GENES) ** len(variables)
+    kept = len(GENES) ** (len(variables) - len(scope))
+    result = [
+        sum(product[i:i + kept]) for i in range(0, len(product), kept)
+    ]
+    total = sum(result)
+    if not total:
+        raise ValueError("known traits are impossible")
+    return tuple(scope), [value / total for value in result]
+
+
+@lru_cache(maxsize=None)
+def entries(strides):
+    """
+    Return the index into a factor's values for every assignment of a
+    list of variables in order, given how far the index moves per
+    copy of the gene of each variable (0 for those not in the factor).
+    """
+    index = [0]
+    for stride in strides:
+        index = [i + genes * stride for i in index for genes in GENES]
+    return index
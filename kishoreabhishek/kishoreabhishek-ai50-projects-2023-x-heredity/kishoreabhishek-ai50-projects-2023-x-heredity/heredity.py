@@ -1,6 +1,13 @@
 import csv
 import itertools
+import os
 import sys
+from multiprocessing import Pool
+
+from elimination import marginals
+from pruning import assignments
+from sampling import SAMPLES, gibbs, likelihood_weighting
+from vectorized import enumerate_totals
 
 PROBS = {
 
@@ -36,29 +43,105 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Ways to compute the probabilities, the first being the default:
+# exact inference over the pedigree, or enumerating every assignment,
+# one at a time, in NumPy batches, across worker processes or skipping
+# those with zero probability, or estimating them by sampling for
+# pedigrees too large for exact inference
+ENGINES = ("eliminate", "enumerate", "vectorized", "parallel", "pruned",
+           "weighting", "gibbs")
+SAMPLERS = {"weighting": likelihood_weighting, "gibbs": gibbs}
+
+# Sampling stops early once no estimate has a larger standard error,
+# as long as the errors rest on enough effective samples to trust
+TARGET_ERROR = 0.001
+MIN_EFFECTIVE = 50
+
+# Ranges of assignments handed out per worker process, so that workers
+# finishing early can pick up more
+PARTS_PER_PROCESS = 8
+
+# People being enumerated, set in each worker process
+pedigree = None
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    engine = sys.argv[2] if len(sys.argv) >= 3 else ENGINES[0]
+    options = sys.argv[3:]
+    if (len(sys.argv) not in (2, 3, 4, 5) or engine not in ENGINES or
+            options and engine not in SAMPLERS or
+            not all(option.isdigit() for option in options) or
+            options and int(options[0]) < 1):
+        sys.exit(f"Usage: python heredity.py data.csv "
+                 f"[{'|'.join(ENGINES)} [samples [seed]]]")
+    samples = int(options[0]) if options else SAMPLES
+    seed = int(options[1]) if len(options) == 2 else None
     people = load_data(sys.argv[1])
 
+    if engine == "eliminate":
+        probabilities = marginals(people, PROBS)
+    elif engine == "vectorized":
+        try:
+            probabilities = enumerate_totals(people, PROBS)
+        except ValueError as error:
+            sys.exit(str(error))
+        normalize(probabilities)
+    elif engine == "parallel":
+        probabilities = parallel_probabilities(people)
+    elif engine == "pruned":
+        stats = {}
+        probabilities = empty_probabilities(people)
+        for one_gene, two_genes, have_trait, p in assignments(
+            people, PROBS, stats
+        ):
+            update(probabilities, one_gene, two_genes, have_trait, p)
+        normalize(probabilities)
+        print(f"Pruned {stats['pruned']:.1%} of {stats['space']} "
+              f"assignments ({stats['evidence_pruned']} by known traits, "
+              f"{stats['zero_pruned']} with zero probability)",
+              file=sys.stderr)
+    elif engine in SAMPLERS:
+        probabilities = None
+        for estimate in SAMPLERS[engine](people, PROBS, samples, seed):
+            probabilities = estimate["probabilities"]
+            error = max(
+                error
+                for person in estimate["errors"].values()
+                for field in person.values()
+                for error in field.values()
+            )
+            print(f"{estimate['samples']} samples "
+                  f"({estimate['effective']:.0f} effective), "
+                  f"largest standard error {error:.4f}", file=sys.stderr)
+            if (error <= TARGET_ERROR and
+                    estimate["effective"] >= MIN_EFFECTIVE):
+                break
+        if probabilities is None:
+            sys.exit("No samples were drawn.")
+    else:
+        probabilities = enumerate_probabilities(people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Return the gene and trait distribution of every person by adding
+    up the joint probability of every assignment of gene counts and
+    traits that agrees with the known traits.
+    """
+
     # Keep track of gene and trait probabilities for each person
-    probabilities = {
-        person: {
-            "gene": {
-                2: 0,
-                1: 0,
-                0: 0
-            },
-            "trait": {
-                True: 0,
-                False: 0
-            }
-        }
-        for person in people
-    }
+    probabilities = empty_probabilities(people)
 
     # Loop over all sets of people who might have the trait
     names = set(people)
@@ -83,15 +166,107 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
+
+def empty_probabilities(people):
+    """
+    Return gene and trait distributions of zero for every person.
+    """
+    return {
+        person: {
+            "gene": {
+                2: 0,
+                1: 0,
+                0: 0
+            },
+            "trait": {
+                True: 0,
+                False: 0
+            }
+        }
+        for person in people
+    }
+
+
+def parallel_probabilities(people, processes=None):
+    """
+    Return the same probabilities as enumerate_probabilities, with the
+    assignments split into ranges that a pool of `processes` worker
+    processes (or this process, if `processes` is 1) enumerate one at
+    a time. Each range adds up its own totals, which are added
+    together before normalizing.
+    """
+    total = 3 ** len(people) * 2 ** sum(
+        people[person]["trait"] is None for person in people
+    )
+    processes = processes or os.cpu_count()
+    parts = min(total, processes * PARTS_PER_PROCESS)
+    bounds = [total * i // parts for i in range(parts + 1)]
+    jobs = list(zip(bounds, bounds[1:]))
+
+    probabilities = empty_probabilities(people)
+    if processes == 1:
+        start_worker(people)
+        for totals in map(enumerate_range, jobs):
+            add_totals(probabilities, totals)
+    else:
+        with Pool(processes, initializer=start_worker,
+                  initargs=(people,)) as pool:
+            for totals in pool.imap_unordered(enumerate_range, jobs):
+                add_totals(probabilities, totals)
+    normalize(probabilities)
+    return probabilities
+
+
+def start_worker(people):
+    """
+    Remember the people being enumerated in this worker process.
+    """
+    global pedigree
+    pedigree = people
+
+
+def enumerate_range(job):
+    """
+    Return the totals (before normalizing) of the assignments numbered
+    from `start` up to `stop`, given as the pair `job`, where
+    the traits of the people with unknown traits are the low bits of
+    an assignment's number and the rest holds everyone's gene count.
+    """
+    start, stop = job
+    names = list(pedigree)
+    known = {person for person in names if pedigree[person]["trait"]}
+    unknown = [person for person in names if pedigree[person]["trait"] is None]
+    probabilities = empty_probabilities(pedigree)
+    for number in range(start, stop):
+        have_trait = set(known)
+        for person in unknown:
+            if number & 1:
+                have_trait.add(person)
+            number >>= 1
+        one_gene, two_genes = set(), set()
+        for person in names:
+            number, genes = divmod(number, 3)
+            if genes == 1:
+                one_gene.add(person)
+            elif genes == 2:
+                two_genes.add(person)
+        p = joint_probability(pedigree, one_gene, two_genes, have_trait)
+        update(probabilities, one_gene, two_genes, have_trait, p)
+    return probabilities
+
+
+def add_totals(probabilities, totals):
+    """
+    Add the distributions in `totals` to those in `probabilities`.
+    """
+    for person in probabilities:
         for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
             for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+                probabilities[person][field][value] += (
+                    totals[person][field][value]
+                )
 
 
 def load_data(filename):
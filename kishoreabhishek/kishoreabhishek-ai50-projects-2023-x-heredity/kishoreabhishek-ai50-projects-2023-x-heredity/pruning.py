@@ -0,0 +1,104 @@
+from elimination import GENES, inheritance
+
+
+def assignments(people, probs, stats=None):
+    """
+    Generate (one_gene, two_genes, have_trait, p) for every assignment
+    of gene counts and traits to `people` that agrees with the known
+    traits and has a joint probability p above zero under the model in
+    `probs`, as sets like heredity.update takes.
+
+    People are assigned parents first, so a branch is cut as soon as
+    its probability reaches zero: a gene count or trait the model rules
+    out, or a gene count a child cannot inherit from their parents'
+    (such as any copies from parents without the gene when there are
+    no mutations). Nothing is built ahead of the assignment being
+    generated, and the sets are fresh for each one.
+
+    If `stats` is a dict, the size of the whole space (every gene count
+    and trait for everyone), the assignments ruled out by the known
+    traits and (so far) by zero probabilities, those generated and the
+    fraction pruned are added to it once generation stops.
+    """
+    order = parents_first(people)
+    inherit = inheritance(probs)
+    # Assignments agreeing with the known traits, of everyone from
+    # each position in `order` onwards
+    sizes = [1]
+    for person in reversed(order):
+        choices = len(GENES) * (2 if people[person]["trait"] is None else 1)
+        sizes.insert(0, sizes[0] * choices)
+    genes = {}
+    one_gene, two_genes, have_trait = set(), set(), set()
+    counts = {"generated": 0, "zero_pruned": 0}
+
+    def extend(i, p):
+        if i == len(order):
+            counts["generated"] += 1
+            yield set(one_gene), set(two_genes), set(have_trait), p
+            return
+        person = order[i]
+        mother, father = people[person]["mother"], people[person]["father"]
+        known = people[person]["trait"]
+        for count in GENES:
+            if mother is None:
+                q = probs["gene"][count]
+            else:
+                q = inherit[genes[mother]][genes[father]][count]
+            genes[person] = count
+            chosen = {1: one_gene, 2: two_genes}.get(count)
+            for trait in (True, False) if known is None else (known,):
+                r = p * q * probs["trait"][count][trait]
+                if not r:
+                    counts["zero_pruned"] += sizes[i + 1]
+                    continue
+                if chosen is not None:
+                    chosen.add(person)
+                if trait:
+                    have_trait.add(person)
+                yield from extend(i + 1, r)
+                have_trait.discard(person)
+                if chosen is not None:
+                    chosen.discard(person)
+        del genes[person]
+
+    try:
+        yield from extend(0, 1)
+    finally:
+        if stats is not None:
+            space = (len(GENES) * 2) ** len(people)
+            stats["space"] = space
+            stats["evidence_pruned"] = space - sizes[0]
+            stats["zero_pruned"] = counts["zero_pruned"]
+            stats["generated"] = counts["generated"]
+            stats["pruned"] = (
+                space - sizes[0] + counts["zero_pruned"]
+            ) / space
+
+
+def parents_first(people):
+    """
+    Return the names in `people` ordered so that everyone comes after
+    their parents.
+    """
+    order = []
+    placed = set()
+    for person in people:
+        stack = [person]
+        while stack:
+            current = stack[-1]
+            if current in placed:
+                stack.pop()
+                continue
+            parents = [
+                parent for parent in (people[current]["mother"],
+                                      people[current]["father"])
+                if parent is not None and parent not in placed
+            ]
+            if parents:
+                stack.extend(parents)
+            else:
+                stack.pop()
+                placed.add(current)
+                order.append(current)
+    return order
@@ -0,0 +1,287 @@
+import math
+
+from elimination import GENES, inheritance
+from pruning import parents_first
+
+# Samples drawn by default, and how many between estimates
+SAMPLES = 100000
+REPORT_EVERY = 10000
+
+# Gene counts (samples times people) drawn at once by likelihood
+# weighting, which bounds its memory use on large pedigrees
+CELLS = 1 << 20
+
+# Gibbs sampling runs this many chains side by side, and discards each
+# chain's first BURN_IN sweeps so it no longer depends on where it
+# started
+CHAINS = 64
+BURN_IN = 100
+
+
+def likelihood_weighting(people, probs, samples=SAMPLES, seed=None,
+                         every=REPORT_EVERY):
+    """
+    Generate estimates (see `estimate`) of the gene and trait
+    distribution of every person in `people` under the model in
+    `probs`, every `every` samples up to `samples`, by likelihood
+    weighting with random numbers seeded by `seed`.
+
+    Each sample draws everyone's gene count from their parents', in
+    NumPy batches of up to CELLS gene counts, and is weighted by how
+    likely the known traits are given those counts. Weights are kept
+    as logarithms relative to the largest so far, so long pedigrees do
+    not underflow. Errors are the standard errors of the weighted
+    means, which only hold while the effective number of samples is
+    not small: with many known traits, a few samples end up with
+    nearly all the weight, and Gibbs sampling does better.
+
+    Raises ValueError unless `samples` is positive.
+    """
+    import numpy
+
+    if samples < 1:
+        raise ValueError("samples must be positive")
+
+    model = tables(people, probs, numpy)
+    rng = numpy.random.default_rng(seed)
+    n = len(model["names"])
+    columns = numpy.arange(n)
+    offsets = columns * len(GENES)
+    # Weighted sums, all relative to exp(scale), or exp(2 * scale) for
+    # squared weights
+    scale = -math.inf
+    weights = squares = 0.0
+    genes_sum = numpy.zeros(n * len(GENES))
+    genes_square = numpy.zeros(n * len(GENES))
+    trait_sum = numpy.zeros(n)
+    trait_square = numpy.zeros(n)
+    trait_square2 = numpy.zeros(n)
+
+    batch = max(1, min(every, CELLS // max(n, 1)))
+    for start in range(0, samples, batch):
+        size = min(batch, samples - start)
+        done = start + size
+        genes = forward_sample(model, size, rng, numpy)
+        log_weights = model["log_evidence"][columns, genes].sum(axis=1)
+        top = log_weights.max()
+        if top > scale:
+            shrink = math.exp(scale - top)
+            weights *= shrink
+            genes_sum *= shrink
+            trait_sum *= shrink
+            squares *= shrink ** 2
+            genes_square *= shrink ** 2
+            trait_square *= shrink ** 2
+            trait_square2 *= shrink ** 2
+            scale = top
+        w = numpy.exp(log_weights - scale)
+        w2 = w * w
+        weights += w.sum()
+        squares += w2.sum()
+        cells = (genes + offsets).ravel()
+        genes_sum += numpy.bincount(cells, weights=numpy.repeat(w, n),
+                                    minlength=len(genes_sum))
+        genes_square += numpy.bincount(cells, weights=numpy.repeat(w2, n),
+                                       minlength=len(genes_square))
+        trait = model["trait"][columns, genes]
+        trait_sum += w @ trait
+        trait_square += w2 @ trait
+        trait_square2 += w2 @ (trait * trait)
+        if done // every == start // every and done < samples:
+            continue
+
+        gene_means = (genes_sum / weights).reshape(n, len(GENES))
+        # Variance of a ratio estimate: sum of w^2 (x - mean)^2 / (sum w)^2,
+        # where x^2 = x for an indicator
+        gene_spread = (
+            genes_square.reshape(n, len(GENES)) * (1 - 2 * gene_means) +
+            gene_means ** 2 * squares
+        )
+        trait_means = trait_sum / weights
+        trait_spread = (
+            trait_square2 - 2 * trait_means * trait_square +
+            trait_means ** 2 * squares
+        )
+        yield estimate(
+            people, model, done, weights ** 2 / squares,
+            gene_means, numpy.sqrt(numpy.maximum(gene_spread, 0)) / weights,
+            trait_means, numpy.sqrt(numpy.maximum(trait_spread, 0)) / weights
+        )
+
+
+def gibbs(people, probs, samples=SAMPLES, seed=None, every=REPORT_EVERY,
+          chains=CHAINS, burn_in=BURN_IN):
+    """
+    Generate estimates (see `estimate`) of the gene and trait
+    distribution of every person in `people` under the model in
+    `probs`, about every `every` samples up to `samples`, by Gibbs
+    sampling with random numbers seeded by `seed`.
+
+    `chains` chains start from gene counts drawn from the parents', and
+    each sweep redraws every person's gene count given everyone else's
+    (their parents', their known trait, and their children's with each
+    child's other parent), for all chains at once. After `burn_in`
+    sweeps, every chain adds up the distribution each person's count
+    was drawn from, and every sweep counts as `chains` samples. Errors
+    are the standard deviation of the chains' means over the square
+    root of their number, which allows for samples from one chain
+    being alike, so the chains are the effective samples.
+
+    The chains only mix if the model gives no gene count probability
+    zero, which holds unless the mutation rate is zero.
+
+    Raises ValueError unless `samples` is positive and there are at
+    least two chains to estimate errors from.
+    """
+    import numpy
+
+    if samples < 1 or chains < 2:
+        raise ValueError("samples must be positive, with at least 2 chains")
+
+    model = tables(people, probs, numpy)
+    rng = numpy.random.default_rng(seed)
+    n = len(model["names"])
+    inherit, evidence = model["inherit"], model["evidence"]
+    genes = forward_sample(model, chains, rng, numpy)
+
+    # Children of each person as (child, other parent, is mother)
+    families = [[] for _ in range(n)]
+    for child, (mother, father) in model["parents"].items():
+        families[mother].append((child, father, True))
+        families[father].append((child, mother, False))
+
+    sweeps = -(-samples // chains)
+    report = max(1, every // chains)
+    totals = numpy.zeros((chains, n, len(GENES)))
+    for sweep in range(burn_in + sweeps):
+        for i in model["order"]:
+            if i in model["parents"]:
+                mother, father = model["parents"][i]
+                conditional = inherit[genes[:, mother], genes[:, father]]
+            else:
+                conditional = numpy.tile(model["prior"], (chains, 1))
+            conditional = conditional * evidence[i]
+            for child, other, is_mother in families[i]:
+                if is_mother:
+                    conditional *= inherit[
+                        :, genes[:, other], genes[:, child]
+                    ].T
+                else:
+                    conditional *= inherit[
+                        genes[:, other], :, genes[:, child]
+                    ]
+            conditional /= conditional.sum(axis=1, keepdims=True)
+            genes[:, i] = draw(conditional, rng, numpy)
+            if sweep >= burn_in:
+                totals[:, i] += conditional
+
+        kept = sweep + 1 - burn_in
+        if kept > 0 and (kept % report == 0 or kept == sweeps):
+            means = totals / kept
+            traits = means @ model["trait_given"]
+            yield estimate(
+                people, model, kept * chains, chains,
+                means.mean(axis=0),
+                means.std(axis=0, ddof=1) / math.sqrt(chains),
+                traits.mean(axis=0),
+                traits.std(axis=0, ddof=1) / math.sqrt(chains)
+            )
+
+
+def tables(people, probs, numpy):
+    """
+    Return a dict describing `people` and the model in `probs` as NumPy
+    tables, with people numbered in the order of `people`.
+    """
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    trait_given = numpy.array([probs["trait"][count][True] for count in GENES])
+    evidence = numpy.ones((len(names), len(GENES)))
+    # Each person's probability of having the trait given each count
+    trait = numpy.tile(trait_given, (len(names), 1))
+    for i, name in enumerate(names):
+        known = people[name]["trait"]
+        if known is not None:
+            evidence[i] = [probs["trait"][count][known] for count in GENES]
+            trait[i] = float(known)
+    with numpy.errstate(divide="ignore"):
+        log_evidence = numpy.log(evidence)
+    return {
+        "names": names,
+        "order": [index[name] for name in parents_first(people)],
+        "parents": {
+            index[name]: (index[people[name]["mother"]],
+                          index[people[name]["father"]])
+            for name in names if people[name]["mother"] is not None
+        },
+        "prior": numpy.array([probs["gene"][count] for count in GENES]),
+        "inherit": numpy.array(inheritance(probs)),
+        "trait_given": trait_given,
+        "evidence": evidence,
+        "log_evidence": log_evidence,
+        "trait": trait
+    }
+
+
+def forward_sample(model, size, rng, numpy):
+    """
+    Return a `size` x N array of gene counts, drawing everyone's from
+    their parents' (or the unconditional distribution), ignoring the
+    known traits.
+    """
+    genes = numpy.empty((size, len(model["names"])), dtype=numpy.intp)
+    for i in model["order"]:
+        if i in model["parents"]:
+            mother, father = model["parents"][i]
+            distribution = model["inherit"][genes[:, mother], genes[:, father]]
+        else:
+            distribution = numpy.broadcast_to(
+                model["prior"], (size, len(GENES))
+            )
+        genes[:, i] = draw(distribution, rng, numpy)
+    return genes
+
+
+def draw(distributions, rng, numpy):
+    """
+    Return one draw from each row of an array of distributions.
+    """
+    cumulative = numpy.cumsum(distributions, axis=1)
+    u = rng.random(len(distributions))
+    return (u[:, None] >= cumulative[:, :-1]).sum(axis=1)
+
+
+def estimate(people, model, samples, effective, gene_means, gene_errors,
+             trait_means, trait_errors):
+    """
+    Return an estimate as a dict of the number of `samples` it is based
+    on, the number of independent samples they are worth for working
+    out its errors ("effective"), "probabilities" in the same form as
+    heredity computes, and the standard "errors" of each of them in
+    the same form.
+
+    Known traits are certain, so they have no error.
+    """
+    probabilities = {}
+    errors = {}
+    for i, name in enumerate(model["names"]):
+        known = people[name]["trait"]
+        if known is not None:
+            trait, error = float(known), 0.0
+        else:
+            trait, error = float(trait_means[i]), float(trait_errors[i])
+        probabilities[name] = {
+            "gene": {
+                count: float(gene_means[i][count]) for count in reversed(GENES)
+            },
+            "trait": {True: trait, False: 1 - trait}
+        }
+        errors[name] = {
+            "gene": {
+                count: float(gene_errors[i][count])
+                for count in reversed(GENES)
+            },
+            "trait": {True: error, False: error}
+        }
+    return {"samples": samples, "effective": float(effective),
+            "probabilities": probabilities, "errors": errors}
@@ -0,0 +1,187 @@
+import sys
+
+import pytest
+
+import elimination
+import heredity
+import pruning
+import vectorized
+
+FAMILY = """name,mother,father,trait
+Arthur,,,0
+Charlie,Molly,Arthur,0
+Fred,Molly,Arthur,1
+Ginny,Molly,Arthur,
+Molly,,,
+Ron,Molly,Arthur,
+"""
+
+# A family with a loop: Dora has a child with her nephew Finn
+LOOP = """name,mother,father,trait
+Alma,,,
+Boris,,,1
+Carla,Alma,Boris,
+Dora,Alma,Boris,0
+Evan,,,
+Finn,Carla,Evan,1
+Gus,Dora,Finn,
+"""
+
+
+@pytest.fixture
+def family(tmp_path):
+    """
+    Writes a small family to a CSV file and returns its name.
+    """
+    filename = tmp_path / "family.csv"
+    filename.write_text(FAMILY)
+    return str(filename)
+
+
+@pytest.fixture(params=[FAMILY, LOOP], ids=["family", "loop"])
+def people(tmp_path, request):
+    """
+    Loads each small family, with its exact probabilities worked out by
+    enumerating every assignment.
+    """
+    filename = tmp_path / "people.csv"
+    filename.write_text(request.param)
+    people = heredity.load_data(str(filename))
+    return people, heredity.enumerate_probabilities(people)
+
+
+def assert_close(probabilities, expected, within=1e-9):
+    """
+    Checks every gene and trait probability against the expected ones.
+    """
+    assert probabilities.keys() == expected.keys()
+    for person, fields in expected.items():
+        for field, values in fields.items():
+            for value, p in values.items():
+                assert probabilities[person][field][value] == pytest.approx(
+                    p, abs=within
+                ), (person, field, value)
+
+
+@pytest.mark.parametrize("options", [
+    ["weighting", "0", "1"],
+    ["weighting", "x"],
+    ["gibbs", "100", "1.5"],
+    ["gibbs", "100", "-1"],
+    ["eliminate", "100"],
+])
+def test_main_rejects_bad_sampling_options(monkeypatch, family, options):
+    monkeypatch.setattr(sys, "argv", ["heredity.py", family] + options)
+    with pytest.raises(SystemExit, match="Usage:"):
+        heredity.main()
+
+
+@pytest.mark.parametrize("engine", ["weighting", "gibbs"])
+def test_main_samples(monkeypatch, capsys, family, engine):
+    monkeypatch.setattr(
+        sys, "argv", ["heredity.py", family, engine, "2000", "1"]
+    )
+    heredity.main()
+    out = capsys.readouterr().out
+    for person in ("Arthur", "Charlie", "Fred", "Ginny", "Molly", "Ron"):
+        assert f"{person}:" in out
+
+
+def test_eliminate_matches_enumeration(people):
+    people, expected = people
+    assert_close(elimination.marginals(people, heredity.PROBS), expected)
+
+
+def test_eliminate_rejects_impossible_traits():
+    people = {"Ann": {"name": "Ann", "mother": None, "father": None,
+                      "trait": True}}
+    probs = dict(heredity.PROBS, trait={
+        count: {True: 0.0, False: 1.0} for count in (0, 1, 2)
+    })
+    with pytest.raises(ValueError):
+        elimination.marginals(people, probs)
+
+
+@pytest.mark.parametrize("batch", [vectorized.BATCH, 7])
+def test_vectorized_matches_enumeration(people, batch):
+    people, expected = people
+    probabilities = vectorized.enumerate_totals(
+        people, heredity.PROBS, batch
+    )
+    heredity.normalize(probabilities)
+    assert_close(probabilities, expected)
+
+
+def test_vectorized_rejects_too_many_assignments():
+    people = {
+        f"P{i}": {"name": f"P{i}", "mother": None, "father": None,
+                  "trait": False}
+        for i in range(40)
+    }
+    with pytest.raises(ValueError, match="too many"):
+        vectorized.enumerate_totals(people, heredity.PROBS)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_parallel_matches_enumeration(people, processes):
+    people, expected = people
+    assert_close(heredity.parallel_probabilities(people, processes),
+                 expected)
+
+
+def pruned_probabilities(people, probs, stats):
+    """
+    Adds up the assignments the pruned engine generates.
+    """
+    probabilities = heredity.empty_probabilities(people)
+    for one_gene, two_genes, have_trait, p in pruning.assignments(
+        people, probs, stats
+    ):
+        heredity.update(probabilities, one_gene, two_genes, have_trait, p)
+    heredity.normalize(probabilities)
+    return probabilities
+
+
+def test_pruned_matches_enumeration(people):
+    people, expected = people
+    stats = {}
+    assert_close(pruned_probabilities(people, heredity.PROBS, stats),
+                 expected)
+    assert stats["zero_pruned"] == 0
+    assert stats["generated"] == stats["space"] - stats["evidence_pruned"]
+
+
+def test_pruned_skips_impossible_inheritance(people):
+    # Without mutations many gene counts cannot be inherited, and the
+    # assignments left must still add up to the exact probabilities
+    people, _ = people
+    probs = dict(heredity.PROBS, mutation=0.0)
+    stats = {}
+    assert_close(pruned_probabilities(people, probs, stats),
+                 elimination.marginals(people, probs))
+    assert stats["zero_pruned"] > 0
+    assert (stats["generated"] + stats["zero_pruned"] +
+            stats["evidence_pruned"] == stats["space"])
+
+
+@pytest.mark.parametrize("sampler", ["weighting", "gibbs"])
+def test_samplers_agree_with_enumeration(people, sampler):
+    # Every estimate must be within five of its standard errors of the
+    # exact probability, and known traits must be exact
+    people, expected = people
+    estimates = list(heredity.SAMPLERS[sampler](
+        people, heredity.PROBS, 20000, seed=1, every=5000
+    ))
+    assert [estimate["samples"] for estimate in estimates] == sorted(
+        estimate["samples"] for estimate in estimates
+    )
+    assert estimates[-1]["samples"] >= 20000
+    probabilities, errors = (
+        estimates[-1]["probabilities"], estimates[-1]["errors"]
+    )
+    for person, fields in expected.items():
+        for field, values in fields.items():
+            for value, p in values.items():
+                assert probabilities[person][field][value] == pytest.approx(
+                    p, abs=5 * errors[person][field][value] + 1e-9
+                ), (person, field, value)
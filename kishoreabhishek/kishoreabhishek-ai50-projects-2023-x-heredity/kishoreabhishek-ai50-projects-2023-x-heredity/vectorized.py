@@ -0,0 +1,117 @@
+from elimination import GENES, inheritance
+
+# Assignments whose joint probabilities are computed at once
+BATCH = 1 << 16
+
+
+def joint_kernel(people, probs, numpy):
+    """
+    Return a function computing, like heredity.joint_probability under
+    the model in `probs`, the joint probability of each of a batch of
+    assignments as a NumPy array.
+
+    It takes an A x N integer array of gene counts and an A x N boolean
+    array of traits, with a row per assignment and a column per person
+    in `people`, in order. The model's tables are built once, here.
+    """
+    names = list(people)
+    column = {name: i for i, name in enumerate(names)}
+    founders = [
+        i for i, name in enumerate(names) if people[name]["mother"] is None
+    ]
+    children = [
+        i for i, name in enumerate(names) if people[name]["mother"] is not None
+    ]
+    mothers = [column[people[names[i]]["mother"]] for i in children]
+    fathers = [column[people[names[i]]["father"]] for i in children]
+    founders, children, mothers, fathers = (
+        numpy.array(indices, dtype=numpy.intp)
+        for indices in (founders, children, mothers, fathers)
+    )
+    prior = numpy.array([probs["gene"][count] for count in GENES])
+    inherit = numpy.array(inheritance(probs))
+    # Probability of each trait (False, True) given the gene count
+    trait = numpy.array([
+        [probs["trait"][count][value] for value in (False, True)]
+        for count in GENES
+    ])
+
+    def joint(genes, traits):
+        factors = trait[genes, traits.astype(numpy.intp)]
+        factors[:, founders] *= prior[genes[:, founders]]
+        factors[:, children] *= inherit[
+            genes[:, mothers], genes[:, fathers], genes[:, children]
+        ]
+        return factors.prod(axis=1)
+
+    return joint
+
+
+def enumerate_totals(people, probs, batch=BATCH):
+    """
+    Return the total joint probability of every assignment of gene
+    counts and traits that agrees with the known traits, split by each
+    person's gene count and trait like heredity.update adds them up,
+    ready for heredity.normalize.
+
+    Assignments are numbered, and `batch` of them at a time are turned
+    into arrays of gene counts and traits for the joint_kernel.
+    Raises ValueError if there are too many assignments to number with
+    64-bit integers, which happens at about 40 people.
+    """
+    import numpy
+
+    joint = joint_kernel(people, probs, numpy)
+    names = list(people)
+    n = len(names)
+    unknown = [
+        i for i, name in enumerate(names) if people[name]["trait"] is None
+    ]
+    known = numpy.array([bool(people[name]["trait"]) for name in names])
+    total = len(GENES) ** n * 2 ** len(unknown)
+    if total > numpy.iinfo(numpy.int64).max:
+        raise ValueError(
+            f"{total} assignments are too many to enumerate; "
+            f"use the eliminate engine instead"
+        )
+
+    # Totals of each person's gene counts and traits, flattened so one
+    # numpy.bincount adds up a whole batch
+    gene_totals = numpy.zeros(n * len(GENES))
+    trait_totals = numpy.zeros(n * 2)
+    gene_offsets = numpy.arange(n) * len(GENES)
+    trait_offsets = numpy.arange(n) * 2
+    for start in range(0, total, batch):
+        stop = min(start + batch, total)
+        rest = numpy.arange(start, stop, dtype=numpy.int64)
+        traits = numpy.tile(known, (len(rest), 1))
+        for i in unknown:
+            traits[:, i] = rest & 1
+            rest >>= 1
+        genes = numpy.empty((len(rest), n), dtype=numpy.intp)
+        for i in range(n):
+            rest, genes[:, i] = numpy.divmod(rest, len(GENES))
+
+        p = joint(genes, traits)
+        gene_totals += numpy.bincount(
+            (genes + gene_offsets).ravel(), weights=numpy.repeat(p, n),
+            minlength=len(gene_totals)
+        )
+        trait_totals += numpy.bincount(
+            (traits + trait_offsets).ravel(), weights=numpy.repeat(p, n),
+            minlength=len(trait_totals)
+        )
+
+    return {
+        name: {
+            "gene": {
+                count: float(gene_totals[i * len(GENES) + count])
+                for count in reversed(GENES)
+            },
+            "trait": {
+                value: float(trait_totals[i * 2 + value])
+                for value in (True, False)
+            }
+        }
+        for i, name in enumerate(names)
+    }
@@ -0,0 +1,328 @@
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+from crawler import crawl_graph
+from extraction import read_hrefs
+from linkgraph import LinkGraph
+from pagerank import DAMPING, SAMPLES
+from ranking import TOLERANCE, iterate, python_step, solve
+from sampling import python_sample, sample_ranks
+
+# Default numbers of pages to benchmark
+SIZES = [1000, 100000, 1000000]
+
+# Samples drawn by each sampling run
+SAMPLE_COUNTS = [SAMPLES, 100000, 1000000, 10000000]
+
+# Links per page follow a Zipf distribution with this exponent, capped
+# at MAX_LINKS, and DANGLING of the pages have no links at all
+ZIPF = 2.0
+MAX_LINKS = 1000
+DANGLING = 0.1
+
+# Links point at page int(size * random() ** SKEW) of their own
+# component, so 1 is uniform and larger values favour a few hub pages
+SKEW = 3.0
+
+# GIANT of the pages form one large component, and the rest fall into
+# isolated components of SMALL_COMPONENT pages that link only to each
+# other
+GIANT = 0.9
+SMALL_COMPONENT = 20
+
+# The reference ranks are converged this far (L1)
+REFERENCE_TOLERANCE = 1e-12
+
+# The plain Python engines are only run on graphs up to this many pages
+PYTHON_LIMIT = 100000
+
+# Link extraction is benchmarked on a corpus of HTML_PAGES pages with
+# about HTML_LINKS links and HTML_TEXT bytes of text each, MALFORMED of
+# which have a long run of unclosed anchor tags and end in an unclosed
+# quote
+HTML_PAGES = 20000
+HTML_LINKS = 20
+HTML_TEXT = 4000
+MALFORMED = 0.01
+MALFORMED_TAGS = 2000
+
+# How pagerank.crawl used to find links
+LEGACY_HREF = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+SEED = 1
+
+
+def main():
+    if sys.argv[1:2] == ["links"]:
+        try:
+            n = int(sys.argv[2]) if len(sys.argv) == 3 else HTML_PAGES
+        except ValueError:
+            n = None
+        if len(sys.argv) > 3 or not n:
+            sys.exit("Usage: python benchmark.py links [pages]")
+        with tempfile.TemporaryDirectory() as directory:
+            generate_pages(directory, n, SEED)
+            print(json.dumps(run_extraction(directory), indent=2))
+        return
+
+    try:
+        sizes = [int(arg) for arg in sys.argv[1:]]
+    except ValueError:
+        sys.exit("Usage: python benchmark.py [pages ...] | links [pages]")
+
+    results = []
+    for n in sizes or SIZES:
+        print(f"Benchmarking {n} pages...", file=sys.stderr)
+        graph = generate(n, SEED)
+        results.append(run(graph))
+
+    print(json.dumps({
+        "config": {
+            "damping": DAMPING,
+            "tolerance": TOLERANCE,
+            "reference_tolerance": REFERENCE_TOLERANCE,
+            "zipf": ZIPF,
+            "max_links": MAX_LINKS,
+            "dangling": DANGLING,
+            "skew": SKEW,
+            "giant": GIANT,
+            "small_component": SMALL_COMPONENT,
+            "seed": SEED
+        },
+        "results": results
+    }, indent=2))
+
+
+def generate(n, seed):
+    """
+    Return a synthetic LinkGraph of `n` pages with a power-law link
+    distribution, pages without links and disconnected components.
+    """
+    import numpy
+
+    rng = numpy.random.default_rng(seed)
+    degrees = numpy.minimum(rng.zipf(ZIPF, n), MAX_LINKS)
+    degrees[rng.random(n) < DANGLING] = 0
+
+    # First page and size of the component of every page, the giant
+    # component coming first
+    giant = max(1, int(n * GIANT))
+    pages = numpy.arange(n, dtype=numpy.int64)
+    starts = numpy.where(
+        pages < giant,
+        0,
+        giant + (pages - giant) // SMALL_COMPONENT * SMALL_COMPONENT
+    )
+    sizes = numpy.where(
+        pages < giant, giant, numpy.minimum(SMALL_COMPONENT, n - starts)
+    )
+
+    sources = numpy.repeat(pages, degrees)
+    targets = starts[sources] + (
+        sizes[sources] * rng.random(len(sources)) ** SKEW
+    ).astype(numpy.int64)
+    # Drop links to the page itself and repeated links, leaving the
+    # links sorted by source and then by target
+    links = numpy.unique((sources * n + targets)[sources != targets])
+    sources, targets = links // n, links % n
+
+    offsets = numpy.zeros(n + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(sources, minlength=n), out=offsets[1:])
+    width = len(str(n - 1))
+    return LinkGraph(
+        [f"{page:0{width}d}.html" for page in range(n)],
+        array("q", offsets.tobytes()),
+        array("i", targets.astype(numpy.int32).tobytes())
+    )
+
+
+def components(n):
+    """
+    Return the number of components generate gives `n` pages.
+    """
+    giant = max(1, int(n * GIANT))
+    return 1 + (n - giant + SMALL_COMPONENT - 1) // SMALL_COMPONENT
+
+
+def run(graph):
+    """
+    Run every engine on `graph` and compare its ranks with reference
+    ranks from power iteration converged to REFERENCE_TOLERANCE.
+    """
+    import numpy
+
+    n = len(graph)
+    offsets = numpy.frombuffer(graph.offsets, dtype=numpy.int64)
+    targets = numpy.frombuffer(graph.targets, dtype=numpy.int32)
+    degrees = numpy.diff(offsets)
+    reference_stats = {}
+    reference = solve(graph, DAMPING, tolerance=REFERENCE_TOLERANCE,
+                      stats=reference_stats)
+    result = {
+        "pages": n,
+        "links": len(targets),
+        "dangling": int((degrees == 0).sum()),
+        "components": components(n),
+        "max_out_links": int(degrees.max()),
+        "max_in_links": int(numpy.bincount(targets, minlength=n).max()),
+        "reference_iterations": reference_stats["iterations"],
+        "engines": {}
+    }
+
+    engines = []
+    for solver in ("power", "gauss-seidel", "extrapolated"):
+        engines.append((solver, lambda stats, solver=solver: solve(
+            graph, DAMPING, solver, stats=stats
+        )))
+    for samples in SAMPLE_COUNTS:
+        engines.append((f"sampling/{samples}", lambda stats, n=samples: (
+            sample_ranks(graph, DAMPING, n, seed=SEED)
+        )))
+    if n <= PYTHON_LIMIT:
+        engines.append(("power/python", lambda stats: python_power(
+            graph, DAMPING, TOLERANCE, stats
+        )))
+        engines.append((f"sampling/python/{SAMPLES}", lambda stats: (
+            python_sample(graph, DAMPING, SAMPLES, seed=SEED)
+        )))
+
+    for name, engine in engines:
+        print(f"  {name}", file=sys.stderr)
+        result["engines"][name] = measure(engine, reference)
+    return result
+
+
+def measure(engine, reference):
+    """
+    Return the wall time and peak memory of calling `engine` with a
+    stats dict, and the error of the ranks it returns.
+
+    Memory is measured with tracemalloc in a second run, so that the
+    tracing does not slow down the timed run.
+    """
+    import numpy
+
+    stats = {}
+    start = time.perf_counter()
+    ranks = engine(stats)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        engine({})
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    error = numpy.abs(numpy.asarray(ranks, dtype=float) - reference)
+    summary = {
+        "seconds": round(seconds, 4),
+        "peak_mb": round(peak / 1e6, 2),
+        "l1_error": float(error.sum()),
+        "max_error": float(error.max())
+    }
+    if "iterations" in stats:
+        summary["iterations"] = stats["iterations"]
+    return summary
+
+
+def python_power(graph, damping_factor, tolerance, stats):
+    """
+    Return the ranks power_iteration computes without NumPy, with
+    the iteration statistics added to `stats`.
+    """
+    n = len(graph)
+    return iterate(python_step(graph, damping_factor), [1 / n] * n,
+                   tolerance, stats=stats)
+
+
+def generate_pages(directory, n, seed):
+    """
+    Write `n` synthetic HTML pages to `directory`, linking to each
+    other with double-quoted, single-quoted and unquoted hrefs, in
+    upper and lower case, and with links in comments and scripts.
+    """
+    rng = random.Random(seed)
+    words = [b"lorem", b"ipsum", b"dolor", b"sit", b"amet", b"page", b"rank"]
+    styles = [
+        b'<a href="%s">', b'<a class="nav" href="%s">', b"<a href='%s'>",
+        b"<a href=%s>", b'<A HREF="%s" title="next">',
+        b'<!-- <a href="%s"> -->', b'<script>s = "<a href=%s>"</script>'
+    ]
+    for page in range(n):
+        parts = [b"<!DOCTYPE html><html><body>"]
+        size = 0
+        while size < HTML_TEXT:
+            part = b" ".join(rng.choices(words, k=rng.randint(5, 30)))
+            parts.append(b"<p>" + part + b"</p>")
+            size += len(part)
+        for _ in range(HTML_LINKS):
+            link = b"%d.html" % rng.randrange(n)
+            parts.insert(rng.randrange(1, len(parts) + 1),
+                         rng.choice(styles) % link)
+        malformed = rng.random() < MALFORMED
+        if malformed:
+            parts.insert(rng.randrange(1, len(parts) + 1),
+                         b"<a name=x " * MALFORMED_TAGS)
+        parts.append(b"</body></html>")
+        if malformed:
+            parts.append(b'<a title="')
+        with open(os.path.join(directory, f"{page}.html"), "wb") as f:
+            f.write(b"\n".join(parts))
+
+
+def run_extraction(directory):
+    """
+    Time finding the hrefs of every page in `directory` with the regex
+    pagerank.crawl used to use and with extraction.read_hrefs, then
+    crawl it with crawler.crawl_graph.
+    """
+    filenames = [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+    ]
+    result = {"pages": len(filenames)}
+
+    start = time.perf_counter()
+    size = found = 0
+    for filename in filenames:
+        with open(filename, "rb") as f:
+            data = f.read()
+        size += len(data)
+        found += len(LEGACY_HREF.findall(data))
+    result["regex"] = rates(found, size, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    found = flagged = 0
+    for filename in filenames:
+        hrefs, _, malformed = read_hrefs(filename)
+        found += len(hrefs)
+        flagged += malformed
+    result["scanner"] = rates(found, size, time.perf_counter() - start)
+    result["scanner"]["flagged"] = flagged
+
+    stats = {}
+    crawl_graph(directory, stats=stats)
+    result["crawl_graph"] = stats
+    return result
+
+
+def rates(hrefs, size, seconds):
+    """
+    Summarize finding `hrefs` hrefs in `size` bytes in `seconds`.
+    """
+    return {
+        "hrefs": hrefs,
+        "seconds": round(seconds, 3),
+        "mb_per_second": round(size / 1e6 / seconds, 1)
+    }
+
+
+if __name__ == "__main__":
+    main()
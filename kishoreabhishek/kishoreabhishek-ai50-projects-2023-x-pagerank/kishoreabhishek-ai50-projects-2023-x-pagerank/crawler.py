@@ -0,0 +1,202 @@
+import json
+import os
+import posixpath
+import sys
+import tempfile
+import time
+from array import array
+from functools import lru_cache
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from urllib.parse import unquote
+
+from extraction import read_hrefs
+from linkgraph import LinkGraph, write_graph
+
+# Files handed to a worker at a time
+CHUNK = 64
+
+# Link targets held in memory before they are flushed to disk, when
+# crawling straight into a graph file
+FLUSH_LINKS = 1 << 20
+
+# Seconds between progress reports
+PROGRESS_SECONDS = 1.0
+
+# Directory, page names and page indices of the corpus being crawled,
+# set in each worker
+corpus = None
+names = None
+index = None
+
+
+def main():
+    if len(sys.argv) not in (2, 3, 4):
+        sys.exit("Usage: python crawler.py corpus [processes] [graph]")
+    processes = int(sys.argv[2]) if len(sys.argv) >= 3 else None
+    output = sys.argv[3] if len(sys.argv) == 4 else None
+    stats = {}
+    graph = crawl_graph(sys.argv[1], processes, progress=report,
+                        stats=stats, output=output)
+    print(f"Crawled {len(graph)} pages and {len(graph.targets)} links.",
+          file=sys.stderr)
+    print(json.dumps(stats, indent=2))
+
+
+def crawl_graph(directory, processes=None, threads=False, progress=None,
+                stats=None, output=None):
+    """
+    Crawl the HTML pages of `directory` like pagerank.crawl, but into
+    a LinkGraph, without building sets of page names.
+
+    Files are scanned by a pool of `processes` worker processes (or
+    threads, if `threads` is true, which suits slow network storage
+    better than CPU-bound scanning), or in this process if `processes`
+    is 1. Links are found by extraction.read_hrefs, which scans the
+    raw bytes and falls back to html.parser for malformed pages. They
+    are resolved relative to the corpus, so "./2.html" and
+    "a/../2.html" both count as links to "2.html", while links leaving
+    the corpus are dropped.
+
+    If `progress` is given, it is called about every PROGRESS_SECONDS
+    with a dict of the files, bytes and links scanned so far, the
+    files that needed html.parser, and the rates. The final such dict
+    is added to `stats` if given.
+
+    With `output`, the graph is written to that file as it is crawled,
+    keeping only the page names and link offsets in memory, and the
+    graph returned is memory-mapped from it.
+    """
+    start = time.perf_counter()
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html") and entry.is_file()
+    )
+    offsets = array("q", [0])
+    targets = array("i")
+    spill = None if output is None else tempfile.TemporaryFile(
+        dir=os.path.dirname(os.path.abspath(output))
+    )
+    # The spill file is closed (and so deleted) however the crawl ends
+    try:
+        counters = {"files": 0, "bytes": 0, "links": 0, "flagged": 0}
+
+        processes = processes or os.cpu_count()
+        if processes == 1:
+            start_worker(directory, pages)
+            workers = None
+            results = map(scan_page, range(len(pages)))
+        else:
+            pool = ThreadPool if threads else Pool
+            workers = pool(processes, initializer=start_worker,
+                           initargs=(directory, pages))
+            results = workers.imap(scan_page, range(len(pages)),
+                                   chunksize=CHUNK)
+
+        reported = start
+        try:
+            for links, size, flagged in results:
+                counters["files"] += 1
+                counters["bytes"] += size
+                counters["links"] += len(links)
+                counters["flagged"] += flagged
+                targets.extend(links)
+                offsets.append(counters["links"])
+                if spill is not None and len(targets) >= FLUSH_LINKS:
+                    spill.write(targets)
+                    del targets[:]
+                now = time.perf_counter()
+                if progress is not None and now - reported >= PROGRESS_SECONDS:
+                    reported = now
+                    progress(throughput(counters, len(pages), now - start))
+        finally:
+            if workers is not None:
+                workers.terminate()
+
+        summary = throughput(counters, len(pages), time.perf_counter() - start)
+        if progress is not None:
+            progress(summary)
+        if stats is not None:
+            stats.update(summary)
+        if spill is None:
+            return LinkGraph(pages, offsets, targets)
+
+        spill.write(targets)
+        spill.seek(0)
+        write_graph(output, pages, offsets, spill)
+        return LinkGraph.open(output)
+    finally:
+        if spill is not None:
+            spill.close()
+
+
+def throughput(counters, total, seconds):
+    """
+    Return the crawl counters with the time taken and rates so far.
+    """
+    summary = dict(counters)
+    summary["total_files"] = total
+    summary["seconds"] = seconds
+    if seconds:
+        summary["files_per_second"] = counters["files"] / seconds
+        summary["mb_per_second"] = counters["bytes"] / 1e6 / seconds
+    else:
+        summary["files_per_second"] = summary["mb_per_second"] = 0
+    return summary
+
+
+def report(summary):
+    """
+    Print a progress line for a crawl to stderr.
+    """
+    print(f"{summary['files']}/{summary['total_files']} files, "
+          f"{summary['files_per_second']:.0f} files/s, "
+          f"{summary['mb_per_second']:.1f} MB/s", file=sys.stderr)
+
+
+def start_worker(directory, pages):
+    """
+    Remember the corpus and the index of every page in this worker.
+    """
+    global corpus, names, index
+    corpus = directory
+    names = pages
+    index = {page: i for i, page in enumerate(pages)}
+
+
+def scan_page(page):
+    """
+    Return (links, size, flagged) for page index `page`: the sorted
+    indices of the other pages in the corpus it links to, its size in
+    bytes, and whether it had to be parsed with html.parser.
+    """
+    hrefs, size, flagged = read_hrefs(os.path.join(corpus, names[page]))
+
+    found = set()
+    for href in set(hrefs):
+        target = index.get(href.decode("utf-8", "replace"))
+        if target is None:
+            target = index.get(resolve(href))
+        if target is not None and target != page:
+            found.add(target)
+    return array("i", sorted(found)), size, flagged
+
+
+@lru_cache(maxsize=1 << 16)
+def resolve(href):
+    """
+    Return the corpus file name a raw href refers to, or None if it
+    points outside the corpus.
+    """
+    link = href.decode("utf-8", "replace")
+    link = link.split("#", 1)[0].split("?", 1)[0]
+    if not link or ":" in link or link.startswith(("/", "\\")):
+        return None
+    link = posixpath.normpath(unquote(link))
+    if link.startswith(".."):
+        return None
+    return link
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import codecs
+import html
+import mmap
+import os
+import re
+from html.parser import HTMLParser
+
+# Places the scanner stops at: comments, the script and style elements,
+# whose contents are not markup, and anchor tags. Anchor tags whose
+# attributes are separated by whitespace are matched whole, with the
+# first href value in whichever of groups 3 to 5 matches; each byte of
+# them can only be read one way, so a failed match is cheap. Other
+# anchor tags match group 6 and are read an attribute at a time.
+TAG = re.compile(
+    rb"<(?:(!--)|(script|style)(?=[\s/>])"
+    rb"|a(?:\s+(?!href[\s/>=])[^\s/>=]+"
+    rb"(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'>][^\s>]*))?)*"
+    rb"(?:\s+href\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>][^\s>]*))"
+    rb"(?:\s+[^\s/>=]+"
+    rb"(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'>][^\s>]*))?)*)?\s*/?>"
+    rb"|(a)(?=[\s/>]))",
+    re.IGNORECASE
+)
+END_TAG = {
+    b"script": re.compile(rb"</script", re.IGNORECASE),
+    b"style": re.compile(rb"</style", re.IGNORECASE)
+}
+
+# One attribute of a tag, or the tag's closing ">"; a value may be
+# double-quoted, single-quoted or unquoted
+ATTRIBUTE = re.compile(
+    rb"[\s/]*(?:(>)|([^\s/>=]+)"
+    rb"(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>][^\s>]*)))?)"
+)
+
+# Files at least this large are memory-mapped rather than read
+MMAP_BYTES = 1 << 20
+
+# Bytes fed to the fallback parser at a time
+PARSE_BYTES = 1 << 16
+
+
+def read_hrefs(filename):
+    """
+    Return (hrefs, size, flagged) for the HTML file `filename`: the
+    href of every anchor tag in it as raw bytes, in order, its size in
+    bytes, and whether the scanner flagged it as too malformed to scan,
+    in which case it was parsed with html.parser instead.
+
+    Files of MMAP_BYTES or more are memory-mapped rather than read, and
+    flagged files are fed to the parser PARSE_BYTES at a time rather
+    than decoded whole.
+    """
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_BYTES:
+            hrefs, flagged = find_hrefs(f.read())
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                hrefs, flagged = find_hrefs(data)
+        if flagged:
+            f.seek(0)
+            hrefs = parse_hrefs(f)
+    return hrefs, size, flagged
+
+
+def find_hrefs(data):
+    """
+    Return (hrefs, flagged) for the HTML bytes `data`: the href of
+    every anchor tag, in order, and whether the page has an unclosed
+    tag, comment, script or quote, where the hrefs found may be wrong.
+
+    Finds the same hrefs as html.parser on well-formed pages. No part
+    of the page is read more than a few times, so the work done stays
+    linear in its size however malformed it is.
+    """
+    hrefs = []
+    position = 0
+    while True:
+        tag = TAG.search(data, position)
+        if tag is None:
+            return hrefs, False
+        if tag.group(1):
+            end = data.find(b"-->", tag.end())
+            if end < 0:
+                return hrefs, True
+            position = end + 3
+            continue
+        if tag.group(2):
+            end = END_TAG[tag.group(2).lower()].search(data, tag.end())
+            if end is None:
+                return hrefs, True
+            position = end.end()
+            continue
+
+        if not tag.group(6):
+            position = tag.end()
+            if tag.lastindex:
+                hrefs.append(unescape(tag.group(tag.lastindex)))
+            continue
+
+        href = None
+        seen = False
+        position = tag.end()
+        while True:
+            attribute = ATTRIBUTE.match(data, position)
+            if attribute is None:
+                return hrefs, True
+            position = attribute.end()
+            if attribute.group(1):
+                break
+            # Like html.parser, only the first href of a tag counts
+            if not seen and attribute.group(2).lower() == b"href":
+                seen = True
+                # The value is whichever of the last three groups matched
+                if attribute.lastindex > 2:
+                    href = attribute.group(attribute.lastindex)
+        if href is not None:
+            hrefs.append(unescape(href))
+
+
+def unescape(href):
+    """
+    Return raw href bytes with any character references replaced.
+    """
+    if b"&" not in href:
+        return href
+    return html.unescape(href.decode("utf-8", "replace")).encode("utf-8")
+
+
+def parse_hrefs(f):
+    """
+    Return the href of every anchor tag in the binary file `f` as
+    UTF-8 bytes, in order, parsed with html.parser.
+    """
+    parser = HrefParser()
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    for chunk in iter(lambda: f.read(PARSE_BYTES), b""):
+        parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.hrefs
+
+
+class HrefParser(HTMLParser):
+    """
+    HTML parser collecting the href of every anchor tag it is fed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        for name, value in attrs:
+            if name == "href":
+                if value is not None:
+                    self.hrefs.append(value.encode("utf-8"))
+                return
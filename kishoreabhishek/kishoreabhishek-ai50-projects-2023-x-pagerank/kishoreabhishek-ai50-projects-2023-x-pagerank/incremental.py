@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import sys
+import time
+import zipfile
+from array import array
+from collections import deque
+
+from crawler import crawl_graph
+from linkgraph import LinkGraph
+from pagerank import DAMPING
+from ranking import TOLERANCE, numpy_step, power_iteration
+
+# Ranks and links of the last run are saved under this name in the
+# cache directory (see state_file), never in the corpus itself
+STATE_NAME = ".pagerank.state"
+
+# Share of the pages that may be pushed one at a time before the push
+# phase gives up and leaves the rest of the work to power iteration
+PUSH_FRACTION = 0.05
+
+
+def main():
+    args = sys.argv[1:]
+    filename = None
+    if len(args) >= 2 and args[-2] == "--state":
+        filename = args[-1]
+        args = args[:-2]
+    if len(args) not in (1, 2) or args[1:] not in ([], ["push"]):
+        sys.exit("Usage: python incremental.py corpus [push] [--state file]")
+    directory = args[0]
+    graph = crawl_graph(directory)
+    stats = {}
+    update_ranks(graph, DAMPING, filename or state_file(directory),
+                 push=len(args) == 2, compare=True, stats=stats)
+    print(json.dumps(stats, indent=2))
+
+
+def state_file(directory):
+    """
+    Return the default state file for the corpus in `directory`: in
+    $PAGERANK_CACHE if set, otherwise in a pagerank directory under
+    $XDG_CACHE_HOME or ~/.cache, with a prefix unique to `directory`.
+    """
+    root = os.environ.get("PAGERANK_CACHE") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "pagerank"
+    )
+    prefix = hashlib.sha256(os.path.realpath(directory).encode())
+    return os.path.join(root, prefix.hexdigest()[:16] + STATE_NAME)
+
+
+def update_ranks(graph, damping_factor, filename, tolerance=TOLERANCE,
+                 push=False, compare=False, stats=None):
+    """
+    Return the PageRank of every page of LinkGraph `graph`, in page
+    index order, starting from the ranks saved in `filename` by the
+    previous run, and save the new ranks and links there.
+
+    Pages kept from the previous run start from their old rank and new
+    pages from 1 / N. With `push`, rank is first pushed out from just
+    the pages whose rank is off (see push_ranks) before iterating.
+    Without a usable previous run this is a cold power iteration.
+
+    If `stats` is a dict, the pages added, removed and with changed
+    links are added to it, along with the iterations taken. With
+    `compare`, a cold run is also made to report how many iterations
+    the warm start saved.
+    """
+    import numpy
+
+    start = time.perf_counter()
+    try:
+        previous, previous_ranks = load_state(filename)
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        previous = None
+
+    initial = None
+    run = {}
+    if previous is not None:
+        remap = remap_pages(previous, graph)
+        initial = numpy.full(len(graph), 1 / len(graph))
+        kept = remap >= 0
+        initial[remap[kept]] = previous_ranks[kept]
+        initial /= initial.sum()
+        if stats is not None:
+            stats.update(diff_graphs(previous, graph, remap))
+        if push:
+            initial = push_ranks(graph, damping_factor, initial,
+                                 tolerance, run)
+    ranks = power_iteration(graph, damping_factor, tolerance,
+                            initial=initial, stats=run)
+    save_state(filename, graph, ranks)
+
+    if stats is not None:
+        stats["warm_start"] = previous is not None
+        stats["pushes"] = run.get("pushes", 0)
+        stats["iterations"] = run["iterations"]
+        stats["residual"] = run["residual"]
+        stats["seconds"] = time.perf_counter() - start
+        if compare:
+            cold = {}
+            power_iteration(graph, damping_factor, tolerance, stats=cold)
+            stats["cold_iterations"] = cold["iterations"]
+            stats["iterations_saved"] = (
+                cold["iterations"] - run["iterations"]
+            )
+            stats["cold_seconds"] = cold["seconds"]
+    return ranks
+
+
+def remap_pages(old, new):
+    """
+    Return a NumPy array giving, for each page index of LinkGraph
+    `old`, its index in LinkGraph `new`, or -1 if it is gone.
+    """
+    import numpy
+
+    if old.pages == new.pages:
+        return numpy.arange(len(old), dtype=numpy.int64)
+    index = {page: i for i, page in enumerate(new.pages)}
+    return numpy.array(
+        [index.get(page, -1) for page in old.pages], dtype=numpy.int64
+    )
+
+
+def diff_graphs(old, new, remap):
+    """
+    Return a dict counting the pages of LinkGraph `new` that were
+    added since LinkGraph `old`, removed from it, or kept but with
+    different links, given `remap` from remap_pages.
+    """
+    import numpy
+
+    n = len(new)
+    kept = remap >= 0
+
+    def links(graph, mapping):
+        offsets = numpy.frombuffer(graph.offsets, dtype=numpy.int64)
+        targets = numpy.frombuffer(graph.targets, dtype=numpy.int32)
+        sources = numpy.repeat(
+            numpy.arange(len(graph), dtype=numpy.int64), numpy.diff(offsets)
+        )
+        if mapping is not None:
+            sources, targets = mapping[sources], mapping[targets]
+            present = (sources >= 0) & (targets >= 0)
+            sources, targets = sources[present], targets[present]
+        return sources * n + targets
+
+    # Pages with a link only one of the two graphs has
+    different = numpy.setxor1d(
+        links(old, remap), links(new, None), assume_unique=True
+    )
+    touched = numpy.zeros(n, dtype=bool)
+    touched[different // n] = True
+    existing = numpy.zeros(n, dtype=bool)
+    existing[remap[kept]] = True
+    # Pages that lost a link to a removed page changed too
+    old_offsets = numpy.frombuffer(old.offsets, dtype=numpy.int64)
+    old_targets = numpy.frombuffer(old.targets, dtype=numpy.int32)
+    lost = numpy.repeat(remap, numpy.diff(old_offsets))[
+        remap[old_targets] < 0
+    ]
+    touched[lost[lost >= 0]] = True
+    return {
+        "added": int(n - existing.sum()),
+        "removed": int(len(old) - kept.sum()),
+        "changed": int((touched & existing).sum())
+    }
+
+
+def push_ranks(graph, damping_factor, ranks, tolerance, stats=None):
+    """
+    Return `ranks` improved by pushing rank out of the pages whose
+    residual (their rank after one more power step, minus their rank)
+    is largest, one page at a time, until the residuals add up to at
+    most `tolerance` or PUSH_FRACTION of the pages were pushed.
+
+    Pages are pushed in rounds, halving the residual needed to be
+    pushed each round. When only a few pages changed since `ranks`
+    were computed, only they and the pages near them have large
+    residuals, so this touches a small part of the graph rather than
+    all of it per iteration. If `stats` is a dict, the number of
+    pushes is added to it.
+    """
+    import numpy
+
+    n = len(graph)
+    offsets, targets = graph.offsets, graph.targets
+    ranks = numpy.array(ranks, dtype=float)
+    spread = numpy_step(graph, damping_factor, numpy)(ranks)
+    residual = spread - ranks
+    budget = int(PUSH_FRACTION * n)
+    epsilon = float(numpy.abs(residual).max())
+
+    # Rank pushed from pages without links reaches every page equally,
+    # so it is kept aside and added to all residuals between rounds
+    uniform = 0.0
+    pushes = 0
+    while pushes < budget:
+        residual += uniform
+        uniform = 0.0
+        total = float(numpy.abs(residual).sum())
+        if total <= tolerance:
+            break
+        epsilon /= 2
+        queue = deque(numpy.flatnonzero(numpy.abs(residual) > epsilon))
+        while queue and pushes < budget and total > tolerance:
+            page = queue.popleft()
+            amount = residual[page]
+            if abs(amount) <= epsilon:
+                continue
+            pushes += 1
+            ranks[page] += amount
+            residual[page] = 0.0
+            total -= abs(amount)
+            start, end = offsets[page], offsets[page + 1]
+            if start == end:
+                uniform += damping_factor * amount / n
+                total += abs(damping_factor * amount)
+                continue
+            share = damping_factor * amount / (end - start)
+            for target in targets[start:end]:
+                before = residual[target]
+                after = before + share
+                residual[target] = after
+                total += abs(after) - abs(before)
+                if abs(before) <= epsilon < abs(after):
+                    queue.append(target)
+
+    if stats is not None:
+        stats["pushes"] = pushes
+    # Pushing leaves rank that should have been spread to every page
+    # in the residuals; the true ranks sum to 1, so add it back evenly
+    return ranks / ranks.sum()
+
+
+def save_state(filename, graph, ranks):
+    """
+    Save LinkGraph `graph` and its `ranks` to `filename`, creating
+    its directory if needed.
+    """
+    import numpy
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            numpy.savez(
+                f,
+                pages=numpy.frombuffer(
+                    "\0".join(graph.pages).encode("utf-8"),
+                    dtype=numpy.uint8
+                ),
+                offsets=numpy.frombuffer(graph.offsets, dtype=numpy.int64),
+                targets=numpy.frombuffer(graph.targets, dtype=numpy.int32),
+                ranks=numpy.asarray(ranks, dtype=float)
+            )
+        os.replace(temporary, filename)
+    except BaseException:
+        # Leave nothing behind from a write that failed
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def load_state(filename):
+    """
+    Return the (LinkGraph, ranks) saved in `filename` by save_state.
+    """
+    import numpy
+
+    with numpy.load(filename) as state:
+        names = state["pages"].tobytes().decode("utf-8")
+        pages = names.split("\0") if names else []
+        offsets = array("q", state["offsets"].tobytes())
+        targets = array("i", state["targets"].tobytes())
+        ranks = state["ranks"]
+    if len(offsets) != len(pages) + 1 or len(ranks) != len(pages):
+        raise ValueError(f"corrupt PageRank state {filename}")
+    return LinkGraph(pages, offsets, targets), ranks
+
+
+if __name__ == "__main__":
+    main()
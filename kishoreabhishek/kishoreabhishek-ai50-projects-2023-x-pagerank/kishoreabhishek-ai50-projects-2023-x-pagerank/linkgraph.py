@@ -0,0 +1,230 @@
+import mmap
+import os
+import shutil
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+
+# Bump whenever the graph file layout changes
+GRAPH_VERSION = 1
+GRAPH_MAGIC = b"LINKGRPH"
+GRAPH_HEADER = struct.Struct("=8sIQQ")
+GRAPH_SECTION = struct.Struct("=QQ")
+
+# Graph file sections in order: page name bytes, page name offsets,
+# link offsets and link targets
+GRAPH_SECTIONS = 4
+
+
+class PageNames(Sequence):
+    """
+    Immutable sequence of page names packed into one UTF-8 blob, where
+    name `i` is `data[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_names(cls, names):
+        """
+        Pack an iterable of page names into a PageNames.
+        """
+        encoded = [name.encode("utf-8") for name in names]
+        offsets = array("q", [0])
+        total = 0
+        for name in encoded:
+            total += len(name)
+            offsets.append(total)
+        return cls(b"".join(encoded), offsets)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        offsets = self.offsets
+        return str(self.data[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __eq__(self, other):
+        if isinstance(other, PageNames):
+            return (self.offsets == other.offsets and
+                    self.data == other.data)
+        if isinstance(other, Sequence):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other)
+            )
+        return NotImplemented
+
+
+class LinkGraph():
+    """
+    Links between the pages of a corpus in compressed sparse row form.
+
+    Pages are numbered by their position in `pages`, which is sorted by
+    name, and the pages that page `i` links to are
+    `targets[offsets[i]:offsets[i + 1]]`, without repeats and without
+    `i` itself.
+
+    A graph opened from a file keeps every part of it memory-mapped,
+    so it can be larger than the memory available.
+    """
+
+    def __init__(self, pages, offsets, targets):
+        self.pages = pages
+        self.offsets = offsets
+        self.targets = targets
+        self.filename = None
+        self.mapping = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a graph from a corpus as returned by crawl, ignoring links
+        to pages outside it.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        offsets = array("q", [0])
+        targets = array("i")
+        for i, page in enumerate(pages):
+            targets.extend(sorted(
+                index[link] for link in corpus[page]
+                if link in index and index[link] != i
+            ))
+            offsets.append(len(targets))
+        return cls(pages, offsets, targets)
+
+    @classmethod
+    def open(cls, filename):
+        """
+        Memory-map a graph written by `save` or write_graph.
+        Raises ValueError if the file is not such a graph.
+        """
+        with open(filename, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        try:
+            magic, version, _, _ = GRAPH_HEADER.unpack_from(view)
+        except struct.error:
+            magic = version = None
+        if magic != GRAPH_MAGIC or version != GRAPH_VERSION:
+            view.release()
+            mapping.close()
+            raise ValueError(f"not a link graph file {filename}")
+
+        sections = []
+        position = GRAPH_HEADER.size
+        for _ in range(GRAPH_SECTIONS):
+            start, length = GRAPH_SECTION.unpack_from(view, position)
+            sections.append(view[start:start + length])
+            position += GRAPH_SECTION.size
+        names, name_offsets, offsets, targets = sections
+
+        graph = cls(PageNames(names, name_offsets.cast("q")),
+                    offsets.cast("q"), targets.cast("i"))
+        graph.filename = filename
+        graph.mapping = mapping
+        return graph
+
+    def save(self, filename):
+        """
+        Write the graph to `filename` in the format read by `open`.
+        """
+        write_graph(filename, self.pages, self.offsets, [self.targets])
+
+    def __reduce__(self):
+        # Worker processes map the same file rather than receive a copy
+        if self.filename is not None:
+            return (LinkGraph.open, (self.filename,))
+        return (LinkGraph, (self.pages, self.offsets, self.targets))
+
+    def __len__(self):
+        return len(self.pages)
+
+    def page(self, name):
+        """
+        Return the index of the page called `name`.
+        Raises KeyError if there is no such page.
+        """
+        i = bisect_left(self.pages, name)
+        if i == len(self.pages) or self.pages[i] != name:
+            raise KeyError(name)
+        return i
+
+    def links(self, page):
+        """
+        Return the indices of the pages that page index `page` links to.
+        """
+        return self.targets[self.offsets[page]:self.offsets[page + 1]]
+
+    def ranks(self, values):
+        """
+        Return a dict mapping each page name to its entry of `values`.
+        """
+        return dict(zip(self.pages, values))
+
+
+def write_graph(filename, pages, offsets, targets):
+    """
+    Write a graph file for the page names `pages`, link `offsets`
+    and link targets, given as an iterable of int32 buffers (or a
+    binary file) to copy one after the other.
+
+    Every section is 8-byte aligned so `LinkGraph.open` can map it
+    straight back into arrays.
+    """
+    if not isinstance(pages, PageNames):
+        pages = PageNames.from_names(pages)
+    offsets = memoryview(offsets).cast("B").cast("q")
+    links = offsets[-1]
+    sections = [
+        memoryview(pages.data).cast("B"),
+        memoryview(pages.offsets).cast("B"),
+        memoryview(offsets).cast("B")
+    ]
+    lengths = [len(section) for section in sections] + [4 * links]
+
+    header = GRAPH_HEADER.size + GRAPH_SECTION.size * GRAPH_SECTIONS
+    position = aligned(header)
+    table = []
+    for length in lengths:
+        table.append((position, length))
+        position = aligned(position + length)
+
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(GRAPH_HEADER.pack(
+                GRAPH_MAGIC, GRAPH_VERSION, len(pages), links
+            ))
+            for start, length in table:
+                f.write(GRAPH_SECTION.pack(start, length))
+            for section, (start, _) in zip(sections, table):
+                f.write(bytes(start - f.tell()))
+                f.write(section)
+            f.write(bytes(table[-1][0] - f.tell()))
+            if hasattr(targets, "read"):
+                shutil.copyfileobj(targets, f)
+            else:
+                for chunk in targets:
+                    f.write(memoryview(chunk).cast("B"))
+            complete = f.tell() == table[-1][0] + table[-1][1]
+        if not complete:
+            raise ValueError("link targets do not match the offsets")
+        os.replace(temporary, filename)
+    except BaseException:
+        # Leave nothing behind from a write that failed
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def aligned(position):
+    """
+    Return `position` rounded up to a multiple of 8.
+    """
+    return (position + 7) // 8 * 8
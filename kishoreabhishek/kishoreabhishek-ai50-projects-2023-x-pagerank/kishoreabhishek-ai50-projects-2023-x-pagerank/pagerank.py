@@ -1,16 +1,23 @@
 import os
-import random
-import re
 import sys
 
+from extraction import read_hrefs
+from linkgraph import LinkGraph
+from personalized import TOP_K, forward_push, personalized_top
+from ranking import MAX_ITERATIONS, TOLERANCE, solve
+from sampling import sample_ranks
+
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
     if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+        sys.exit("Usage: python pagerank.py corpus|graph")
+    if os.path.isdir(sys.argv[1]):
+        corpus = crawl(sys.argv[1])
+    else:
+        corpus = LinkGraph.open(sys.argv[1])
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -33,10 +40,9 @@ def crawl(directory):
     for filename in os.listdir(directory):
         if not filename.endswith(".html"):
             continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+        hrefs, _, _ = read_hrefs(os.path.join(directory, filename))
+        links = set(href.decode("utf-8", "replace") for href in hrefs)
+        pages[filename] = links - {filename}
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -82,31 +88,18 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `corpus` may also be a LinkGraph, such as one memory-mapped from
+    a graph file, which is used as it is.
     """
-    pagerankdict = {}
-    for k in corpus.keys():
-        pagerankdict[k]=0
-    rp=None
-    for i in range(n):
-        if i==0:
-            rp = random.choice(list(corpus.keys()))
-            pagerankdict[rp] = (pagerankdict[rp]+1)
-        else:
-            prank = transition_model(corpus,rp,damping_factor)
-            plist = [k for k,v in prank.items()]
-            rlist = [v for k,v in prank.items()]
-            # print(plist)
-            # print(rlist)
-            rp = random.choices(plist,rlist,k=1)[0]
-            # print(rp)
-            pagerankdict[rp] = (pagerankdict[rp] + 1)
-    for k,v in pagerankdict.items():
-        pagerankdict[k] = v/n
-    # print(corpus)
-    return pagerankdict
+    graph = as_graph(corpus)
+    ranks = sample_ranks(graph, damping_factor, n)
+    return graph.ranks(float(rank) for rank in ranks)
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, solver="power",
+                     tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                     stats=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -114,41 +107,54 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `corpus` may also be a LinkGraph, such as one memory-mapped from
+    a graph file, which is used as it is. `solver`, `tolerance`,
+    `max_iterations` and `stats` are passed on to ranking.solve.
     """
-    pagerankdict={}
-    newpagerankdict={}
-    N = len(corpus)
-    for k in corpus.keys():
-        pagerankdict[k] = 1/N
-    while True:
-        for p in corpus.keys():
-            newpagerankdict[p] = ((1-damping_factor)/N) + pr(corpus,damping_factor,pagerankdict,p)
-        if checkthresholdreached(newpagerankdict,pagerankdict,0.001):
-            break
-        else:
-            pagerankdict = newpagerankdict
+    graph = as_graph(corpus)
+    ranks = solve(graph, damping_factor, solver, tolerance, max_iterations,
+                  stats=stats)
+    return graph.ranks(float(rank) for rank in ranks)
 
-    return pagerankdict
+
+def personalized_pagerank(corpus, seed_sets, damping_factor, k=TOP_K):
+    """
+    Return, for each collection of page names in `seed_sets`, a
+    dictionary of the `k` pages with the highest PageRank for a surfer
+    who always jumps to one of those pages rather than to any page,
+    mapped to their PageRank values.
+
+    All the seed sets are ranked together by batched power iteration.
+    """
+    graph = as_graph(corpus)
+    indices = [[graph.page(page) for page in seeds] for seeds in seed_sets]
+    return [
+        {graph.pages[page]: rank for page, rank in top}
+        for top in personalized_top(graph, indices, damping_factor, k)
+    ]
 
 
-def pr(corpus,dampingfactor,pagerankdict,p):
-    numlinks = {}
-    ipr = 0
-    for page in corpus.keys():
-        if (p in corpus[page] or len(corpus[page]) == 0) and page != p:
-            if len(corpus[page]) > 0:
-                numlinks[page] = len(corpus[page])
-            else:
-                numlinks[page] = len(corpus)
-            ipr = ipr + pagerankdict[page]/numlinks[page]
+def local_pagerank(corpus, seeds, damping_factor, k=TOP_K, seed=None):
+    """
+    Return the same dictionary as personalized_pagerank for the single
+    collection of page names `seeds`, estimated by forward push and
+    random walks from the seeds (seeded by `seed`), which only visits
+    the part of the corpus near them.
+    """
+    graph = as_graph(corpus)
+    top = forward_push(graph, [graph.page(page) for page in seeds],
+                       damping_factor, k, seed=seed)
+    return {graph.pages[page]: rank for page, rank in top}
 
-    return ipr*dampingfactor
 
-def checkthresholdreached(newdict,olddict,threshold):
-    for k in newdict.keys():
-        if newdict[k] - olddict[k] <= threshold:
-            return True
-    return False
+def as_graph(corpus):
+    """
+    Return `corpus` as a LinkGraph.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+import heapq
+import math
+import random
+import time
+from collections import deque
+
+from ranking import MAX_ITERATIONS, TOLERANCE
+
+# Seed sets ranked together, each needing one dense column of ranks
+BATCH = 32
+
+# Pages returned per seed set
+TOP_K = 10
+
+# Forward push stops once every page's residual is at most this much
+# per link, and the walks then spread the remaining residual
+PUSH_EPSILON = 1e-6
+WALKS = 10000
+
+
+def personalized_top(graph, seed_sets, damping_factor, k=TOP_K,
+                     tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                     batch=BATCH, stats=None):
+    """
+    Return, for each collection of page indices in `seed_sets`, the
+    `k` pages of LinkGraph `graph` with the highest personalized
+    PageRank as a list of (page index, rank) pairs, best first.
+
+    A surfer personalized to a seed set jumps only to its seed pages,
+    each equally likely, both at random and when it reaches a page
+    without links. Seed sets are solved `batch` at a time as one
+    matrix with a column per seed set, each step moving every column's
+    rank along every link at once, until every column changes by at
+    most `tolerance` (L1) or after `max_iterations` steps. Only the
+    top `k` of each column are kept once its batch is done.
+
+    If `stats` is a dict, the batches, total iterations and time taken
+    are added to it.
+    """
+    import numpy
+
+    start = time.perf_counter()
+    seed_sets = [sorted(set(seeds)) for seeds in seed_sets]
+    step = batch_step(graph, damping_factor, numpy)
+    results = []
+    iterations = 0
+    batches = 0
+    for first in range(0, len(seed_sets), batch):
+        group = seed_sets[first:first + batch]
+        if not all(group):
+            raise ValueError("empty seed set")
+        # Teleport distributions as (page, column, probability) entries
+        teleport = tuple(numpy.array(values) for values in zip(*(
+            (page, column, 1 / len(seeds))
+            for column, seeds in enumerate(group) for page in seeds
+        )))
+
+        ranks = numpy.zeros((len(graph), len(group)))
+        ranks[teleport[0], teleport[1]] = teleport[2]
+        for _ in range(max_iterations):
+            ranks, residual = step(ranks, teleport)
+            iterations += 1
+            if residual.max() <= tolerance:
+                break
+        batches += 1
+
+        for column in range(len(group)):
+            results.append(top(ranks[:, column], k, numpy))
+
+    if stats is not None:
+        stats["batches"] = batches
+        stats["iterations"] = iterations
+        stats["seconds"] = time.perf_counter() - start
+    return results
+
+
+def batch_step(graph, damping_factor, numpy):
+    """
+    Return a function taking an N x B matrix of ranks and the
+    (pages, columns, probabilities) arrays of the nonzero entries of
+    the matching teleport distributions to (next ranks, L1 change of
+    each column). The ranks passed in are overwritten.
+
+    Uses a SciPy sparse matrix product when SciPy is installed, and one
+    numpy.bincount over the links per column otherwise.
+    """
+    n = len(graph)
+    offsets = numpy.frombuffer(graph.offsets, dtype=numpy.int64)
+    targets = numpy.frombuffer(graph.targets, dtype=numpy.int32)
+    degrees = numpy.diff(offsets)
+    dangling = degrees == 0
+    share = numpy.zeros(n)
+    share[~dangling] = damping_factor / degrees[~dangling]
+
+    try:
+        from scipy import sparse
+    except ImportError:
+        sources = numpy.repeat(numpy.arange(n, dtype=numpy.int32), degrees)
+
+        def spread_links(ranks):
+            weighted = ranks * share[:, None]
+            spread = numpy.empty_like(ranks)
+            for column in range(ranks.shape[1]):
+                spread[:, column] = numpy.bincount(
+                    targets, weights=weighted[sources, column], minlength=n
+                )
+            return spread
+    else:
+        # Row i holds the share of each page's rank passed on to page i
+        matrix = sparse.csr_matrix(
+            (numpy.repeat(share, degrees), targets, offsets), shape=(n, n)
+        ).T.tocsr()
+
+        def spread_links(ranks):
+            return matrix @ ranks
+
+    def step(ranks, teleport):
+        pages, columns, probabilities = teleport
+        spread = spread_links(ranks)
+        jump = (1 - damping_factor) + (
+            damping_factor * ranks[dangling].sum(axis=0)
+        )
+        numpy.add.at(spread, (pages, columns), probabilities * jump[columns])
+        ranks -= spread
+        return spread, numpy.abs(ranks, out=ranks).sum(axis=0)
+
+    return step
+
+
+def top(values, k, numpy):
+    """
+    Return the `k` largest entries of vector `values` as (index,
+    value) pairs, largest first.
+    """
+    k = min(k, len(values))
+    best = numpy.argpartition(-values, k - 1)[:k]
+    best = best[numpy.argsort(-values[best], kind="stable")]
+    return [(int(page), float(values[page])) for page in best]
+
+
+def forward_push(graph, seeds, damping_factor, k=TOP_K,
+                 epsilon=PUSH_EPSILON, walks=WALKS, seed=None, stats=None):
+    """
+    Return the `k` pages of LinkGraph `graph` with the highest
+    personalized PageRank for the page indices `seeds`, estimated
+    locally, as a list of (page index, rank) pairs, best first.
+
+    Rank starts as residual on the seed pages and is pushed along
+    links, keeping 1 - `damping_factor` of it at each page pushed,
+    until no page holds more than `epsilon` residual per link. The
+    residual left is then spread by about `walks` random walks started
+    from the pages holding it (so the estimate is unbiased), with
+    `seed` seeding them. Only pages reached are ever touched, so the
+    cost does not depend on the size of the graph.
+
+    If `stats` is a dict, the pushes, walks and pages touched are
+    added to it.
+    """
+    seeds = sorted(set(seeds))
+    if not seeds:
+        raise ValueError("empty seed set")
+    offsets, targets = graph.offsets, graph.targets
+    estimate = {}
+    residual = {page: 1 / len(seeds) for page in seeds}
+    queue = deque(seeds)
+    pushes = 0
+    while queue:
+        page = queue.popleft()
+        amount = residual.get(page, 0.0)
+        start, end = offsets[page], offsets[page + 1]
+        if amount <= epsilon * max(end - start, 1):
+            continue
+        pushes += 1
+        residual[page] = 0.0
+        estimate[page] = estimate.get(page, 0.0) + (
+            (1 - damping_factor) * amount
+        )
+        # Pages without links send the surfer back to the seeds
+        receivers = targets[start:end] if start != end else seeds
+        share = damping_factor * amount / len(receivers)
+        for receiver in receivers:
+            before = residual.get(receiver, 0.0)
+            residual[receiver] = before + share
+            limit = epsilon * max(offsets[receiver + 1] -
+                                  offsets[receiver], 1)
+            if before <= limit < before + share:
+                queue.append(receiver)
+
+    rng = random.Random(seed)
+    left = sum(residual.values())
+    walked = 0
+    for page, amount in residual.items():
+        if amount <= 0:
+            continue
+        count = math.ceil(amount / left * walks)
+        for _ in range(count):
+            end = random_walk(offsets, targets, seeds, page, damping_factor,
+                              rng)
+            estimate[end] = estimate.get(end, 0.0) + amount / count
+        walked += count
+
+    if stats is not None:
+        stats["pushes"] = pushes
+        stats["walks"] = walked
+        stats["touched"] = len(set(estimate) | set(residual))
+    return heapq.nlargest(k, estimate.items(), key=lambda item: item[1])
+
+
+def random_walk(offsets, targets, seeds, page, damping_factor, rng):
+    """
+    Return where a surfer starting at `page` stops, stopping with
+    probability 1 - `damping_factor` before each step.
+    """
+    while rng.random() < damping_factor:
+        start, end = offsets[page], offsets[page + 1]
+        if start == end:
+            page = rng.choice(seeds)
+        else:
+            page = targets[start + rng.randrange(end - start)]
+    return page
@@ -0,0 +1,277 @@
+import time
+
+# Iteration stops once the ranks change by at most this much in total
+# (L1 norm), which also bounds the change of every single page
+TOLERANCE = 0.001
+MAX_ITERATIONS = 1000
+
+# Pages updated together by each vectorized Gauss-Seidel block
+GAUSS_SEIDEL_BLOCK = 1 << 12
+
+# Power steps between extrapolations
+EXTRAPOLATE_EVERY = 10
+
+# Links read at a time by each power step
+STEP_LINKS = 1 << 22
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, initial=None, stats=None):
+    """
+    Return the PageRank of every page of LinkGraph `graph`, in page
+    index order, by power iteration from the uniform distribution, or
+    from the ranks in `initial` if given.
+
+    Each step moves rank along every link at once. A page without
+    links counts as linking to every page, itself included, so its
+    rank is spread evenly over the corpus. Stops when the L1 change
+    is at most `tolerance` or after `max_iterations` steps. If `stats`
+    is a dict, the number of iterations, the final residual and the
+    time taken are added to it, along with a "history" of the L1 and
+    L-infinity change and the time taken by every iteration.
+
+    Uses NumPy when it is installed, and plain Python lists otherwise.
+    """
+    return solve(graph, damping_factor, "power", tolerance, max_iterations,
+                 initial, stats)
+
+
+def solve(graph, damping_factor, solver="power", tolerance=TOLERANCE,
+          max_iterations=MAX_ITERATIONS, initial=None, stats=None):
+    """
+    Return the same ranks as power_iteration, computed by the named
+    solver, with the same stopping rule and statistics:
+
+    "power" is power_iteration itself.
+    "gauss-seidel" updates the pages in order, each block of
+    GAUSS_SEIDEL_BLOCK pages at once from the newest ranks of the
+    blocks before it, which usually needs fewer sweeps.
+    "extrapolated" is power iteration that, every EXTRAPOLATE_EVERY
+    steps, estimates from the last few iterates and removes the two
+    slowest decaying parts of the error.
+
+    All but "power" need NumPy. "power" and "extrapolated" read the
+    links of a memory-mapped graph a chunk at a time, so those links
+    need not fit in memory; "gauss-seidel" loads them all.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}")
+    start = time.perf_counter()
+    n = len(graph)
+    try:
+        import numpy
+    except ImportError:
+        if solver != "power":
+            raise
+        numpy = None
+        step = python_step(graph, damping_factor)
+        if initial is None:
+            ranks = [1 / n] * n
+        else:
+            ranks = [float(rank) for rank in initial]
+    else:
+        step = SOLVERS[solver](graph, damping_factor, numpy)
+        if initial is None:
+            ranks = numpy.full(n, 1 / n)
+        else:
+            ranks = numpy.array(initial, dtype=float)
+
+    ranks = iterate(step, ranks, tolerance, max_iterations, numpy, stats)
+    if stats is not None:
+        stats["solver"] = solver
+        stats["seconds"] = time.perf_counter() - start
+    return ranks
+
+
+def iterate(step, ranks, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+            numpy=None, stats=None):
+    """
+    Apply the step function `step` to `ranks`, a NumPy array, or a list
+    if `numpy` is None, until the L1 change is at most `tolerance` or
+    after `max_iterations` steps, and return the last ranks. If `stats`
+    is a dict, the iteration statistics solve describes are added to it.
+    """
+    history = []
+    iterations = 0
+    residual = None
+    while iterations < max_iterations:
+        began = time.perf_counter()
+        new = step(ranks)
+        if numpy is None:
+            changes = [abs(a - b) for a, b in zip(new, ranks)]
+            residual, largest = sum(changes), max(changes)
+        else:
+            changes = numpy.abs(new - ranks)
+            residual, largest = float(changes.sum()), float(changes.max())
+        ranks = new
+        iterations += 1
+        history.append({
+            "l1": residual,
+            "linf": largest,
+            "seconds": time.perf_counter() - began
+        })
+        if residual <= tolerance:
+            break
+
+    if stats is not None:
+        stats["iterations"] = iterations
+        stats["residual"] = residual
+        stats["history"] = history
+    return ranks
+
+
+def numpy_step(graph, damping_factor, numpy):
+    """
+    Return a function taking a rank vector to the next ranks by one
+    power step, vectorized with NumPy over the graph's link arrays.
+
+    Links are read STEP_LINKS at a time, so beyond a few arrays with
+    one entry per page, a step needs memory only for one chunk of
+    links. The links of a memory-mapped graph can then be larger than
+    the memory available.
+    """
+    n = len(graph)
+    offsets = numpy.frombuffer(graph.offsets, dtype=numpy.int64)
+    targets = numpy.frombuffer(graph.targets, dtype=numpy.int32)
+    degrees = numpy.diff(offsets)
+    dangling = degrees == 0
+    # Share of a page's rank passed along each of its links
+    share = numpy.zeros(n)
+    share[~dangling] = damping_factor / degrees[~dangling]
+    # Pages whose links make up each chunk, as (first, last + 1)
+    bounds = numpy.searchsorted(
+        offsets, numpy.arange(0, offsets[-1], STEP_LINKS), side="right"
+    ) - 1
+    bounds = numpy.unique(numpy.concatenate(([0], bounds, [n])))
+    chunks = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def step(ranks):
+        weighted = ranks * share
+        spread = numpy.full(n, ((1 - damping_factor) +
+                                damping_factor * ranks[dangling].sum()) / n)
+        for low, high in chunks:
+            spread += numpy.bincount(
+                targets[offsets[low]:offsets[high]],
+                weights=numpy.repeat(weighted[low:high], degrees[low:high]),
+                minlength=n
+            )
+        return spread
+
+    return step
+
+
+def gauss_seidel_step(graph, damping_factor, numpy):
+    """
+    Return a function taking a rank vector to the next ranks by one
+    block Gauss-Seidel sweep.
+
+    Links are grouped by the page they point to, so each block of
+    pages gathers just the links into it, from ranks that already
+    include the updates of earlier blocks in the same sweep. The
+    regrouped links are held in memory (about 8 bytes per link), so
+    unlike power iteration this needs the links to fit in memory.
+    """
+    n = len(graph)
+    offsets = numpy.frombuffer(graph.offsets, dtype=numpy.int64)
+    targets = numpy.frombuffer(graph.targets, dtype=numpy.int32)
+    degrees = numpy.diff(offsets)
+    sources = numpy.repeat(numpy.arange(n, dtype=numpy.int32), degrees)
+    order = numpy.argsort(targets, kind="stable")
+    sources = sources[order]
+    into = targets[order]
+    del order
+    # First link into each block of pages
+    bounds = numpy.arange(0, n + GAUSS_SEIDEL_BLOCK, GAUSS_SEIDEL_BLOCK)
+    bounds[-1] = n
+    firsts = numpy.searchsorted(into, bounds)
+    dangling = degrees == 0
+    share = numpy.zeros(n)
+    share[~dangling] = damping_factor / degrees[~dangling]
+
+    def step(ranks):
+        ranks = ranks.copy()
+        weighted = ranks * share
+        left = float(ranks[dangling].sum())
+        for block in range(len(bounds) - 1):
+            low, high = bounds[block], bounds[block + 1]
+            begin, end = firsts[block], firsts[block + 1]
+            spread = numpy.bincount(
+                into[begin:end] - low, weights=weighted[sources[begin:end]],
+                minlength=high - low
+            )
+            spread += ((1 - damping_factor) + damping_factor * left) / n
+            # Keep the dangling total and weighted ranks current
+            holes = dangling[low:high]
+            left += float(spread[holes].sum() - ranks[low:high][holes].sum())
+            ranks[low:high] = spread
+            weighted[low:high] = spread * share[low:high]
+        return ranks
+
+    return step
+
+
+def extrapolated_step(graph, damping_factor, numpy):
+    """
+    Return a function taking a rank vector to the next ranks by one
+    power step, with quadratic extrapolation every EXTRAPOLATE_EVERY
+    steps.
+
+    Extrapolation assumes the error of the last four iterates lies
+    along the two slowest decaying directions, finds by least squares
+    the combination of three of them in which those cancel, and jumps
+    straight to it.
+    """
+    power = numpy_step(graph, damping_factor, numpy)
+    steps = 0
+    recent = []
+
+    def step(ranks):
+        nonlocal steps
+        spread = power(ranks)
+        steps += 1
+        recent.append(ranks)
+        del recent[:-3]
+        if steps % EXTRAPOLATE_EVERY or len(recent) < 3:
+            return spread
+        first, second, third = recent
+        ys = numpy.stack([second - first, third - first], axis=1)
+        gamma, *_ = numpy.linalg.lstsq(ys, first - spread, rcond=None)
+        beta = (gamma[0] + gamma[1] + 1, gamma[1] + 1, 1)
+        extrapolated = beta[0] * second + beta[1] * third + beta[2] * spread
+        numpy.maximum(extrapolated, 0, out=extrapolated)
+        recent.clear()
+        return extrapolated / extrapolated.sum()
+
+    return step
+
+
+def python_step(graph, damping_factor):
+    """
+    Return the same step function as numpy_step, in plain Python.
+    """
+    n = len(graph)
+    offsets, targets = graph.offsets, graph.targets
+
+    def step(ranks):
+        spread = [0.0] * n
+        dangling = 0.0
+        for page in range(n):
+            start, end = offsets[page], offsets[page + 1]
+            if start == end:
+                dangling += ranks[page]
+                continue
+            share = damping_factor * ranks[page] / (end - start)
+            for target in targets[start:end]:
+                spread[target] += share
+        base = ((1 - damping_factor) + damping_factor * dangling) / n
+        return [rank + base for rank in spread]
+
+    return step
+
+
+# Step function factories of the solvers available to solve
+SOLVERS = {
+    "power": numpy_step,
+    "gauss-seidel": gauss_seidel_step,
+    "extrapolated": extrapolated_step
+}
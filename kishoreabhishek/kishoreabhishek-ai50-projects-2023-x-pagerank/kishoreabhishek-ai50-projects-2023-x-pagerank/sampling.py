@@ -0,0 +1,148 @@
+import random
+from multiprocessing import Pool
+
+# Independent random surfers simulated side by side
+WALKERS = 65536
+
+# Steps each surfer takes before its pages are counted, so the samples
+# do not depend on where it started; surfers are limited to one per
+# BURN_IN samples so that this stays a small part of the work
+BURN_IN = 50
+
+# Visited pages buffered before they are counted all at once
+COUNT_BATCH = 1 << 22
+
+# LinkGraph being sampled in each worker process
+shared = None
+
+
+def sample_ranks(graph, damping_factor, n, seed=None, walkers=WALKERS,
+                 processes=None):
+    """
+    Return the PageRank of every page of LinkGraph `graph`, in page
+    index order, estimated from `n` samples of random surfers.
+
+    Each surfer starts on a page chosen at random and then, with
+    probability `damping_factor`, follows one of the current page's
+    links at random, or otherwise (or if the page has no links) jumps
+    to any page at random. `walkers` surfers take their steps together,
+    and after BURN_IN steps every page they stand on counts as one
+    sample.
+
+    `seed` makes the estimate reproducible. With `processes`, the
+    samples are split over that many worker processes, each with its
+    own independent stream of random numbers.
+
+    Uses NumPy when it is installed, and one surfer in plain Python
+    otherwise (in which case `walkers` and `processes` are ignored).
+    """
+    try:
+        import numpy
+    except ImportError:
+        return python_sample(graph, damping_factor, n, seed)
+
+    seeds = numpy.random.SeedSequence(seed)
+    if not processes or processes == 1:
+        counts = walk(graph.offsets, graph.targets, damping_factor, n,
+                      walkers, seeds)
+        return counts / n
+
+    parts = [n // processes + (i < n % processes) for i in range(processes)]
+    jobs = [
+        (damping_factor, part, walkers, child)
+        for part, child in zip(parts, seeds.spawn(processes))
+        if part
+    ]
+    with Pool(processes, initializer=start_worker,
+              initargs=(graph,)) as pool:
+        counts = sum(pool.map(walk_part, jobs))
+    return counts / n
+
+
+def start_worker(graph):
+    """
+    Keep the graph being sampled in this worker process. A graph opened
+    from a file arrives as its file name and is mapped again here.
+    """
+    global shared
+    shared = graph
+
+
+def walk_part(job):
+    """
+    Return the visit counts of one worker's share of the samples.
+    """
+    damping_factor, n, walkers, seeds = job
+    return walk(shared.offsets, shared.targets, damping_factor, n, walkers,
+                seeds)
+
+
+def walk(graph_offsets, graph_targets, damping_factor, n, walkers, seeds):
+    """
+    Return how many of `n` samples landed on each page, simulating
+    `walkers` surfers at once with random numbers from SeedSequence
+    `seeds`.
+    """
+    import numpy
+
+    rng = numpy.random.default_rng(seeds)
+    starts = numpy.frombuffer(graph_offsets, dtype=numpy.int64)
+    links = numpy.frombuffer(graph_targets, dtype=numpy.int32)
+    pages = len(starts) - 1
+    degrees = numpy.diff(starts)
+
+    def advance(positions):
+        # Everyone jumps at random, except those following a link
+        degree = degrees[positions]
+        follow = (rng.random(len(positions)) < damping_factor) & (degree > 0)
+        following = positions[follow]
+        choice = (rng.random(len(following)) * degree[follow]).astype(
+            numpy.int64
+        )
+        positions = rng.integers(pages, size=len(positions))
+        positions[follow] = links[starts[following] + choice]
+        return positions
+
+    positions = rng.integers(pages, size=max(1, min(walkers, n // BURN_IN)))
+    for _ in range(BURN_IN):
+        positions = advance(positions)
+
+    counts = numpy.zeros(pages, dtype=numpy.int64)
+    pending = []
+    buffered = 0
+    remaining = n
+    while True:
+        sample = positions[:remaining]
+        pending.append(sample)
+        buffered += len(sample)
+        remaining -= len(sample)
+        if buffered >= COUNT_BATCH or not remaining:
+            counts += numpy.bincount(
+                numpy.concatenate(pending), minlength=pages
+            )
+            pending = []
+            buffered = 0
+        if not remaining:
+            return counts
+        positions = advance(positions)
+
+
+def python_sample(graph, damping_factor, n, seed=None):
+    """
+    Return the same estimate as sample_ranks from a single surfer,
+    in plain Python.
+    """
+    rng = random.Random(seed)
+    pages = len(graph)
+    offsets, targets = graph.offsets, graph.targets
+    counts = [0] * pages
+    page = rng.randrange(pages)
+    for i in range(BURN_IN + n):
+        if i >= BURN_IN:
+            counts[page] += 1
+        start, end = offsets[page], offsets[page + 1]
+        if start != end and rng.random() < damping_factor:
+            page = targets[start + rng.randrange(end - start)]
+        else:
+            page = rng.randrange(pages)
+    return [count / n for count in counts]
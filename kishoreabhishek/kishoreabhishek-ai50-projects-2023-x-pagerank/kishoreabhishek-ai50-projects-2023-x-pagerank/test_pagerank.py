@@ -0,0 +1,404 @@
+import io
+import json
+import os
+import random
+import sys
+from array import array
+
+import pytest
+
+import benchmark
+import crawler
+import extraction
+import incremental
+import pagerank
+import personalized
+import ranking
+import sampling
+from linkgraph import LinkGraph, write_graph
+from pagerank import DAMPING
+
+# Small corpus with a page without links and a page nothing links to
+CORPUS = {
+    "1.html": {"2.html"},
+    "2.html": {"1.html", "3.html"},
+    "3.html": {"2.html", "4.html"},
+    "4.html": {"2.html"},
+    "5.html": set(),
+    "6.html": {"1.html", "5.html"}
+}
+
+# Tolerance the exact ranks are converged to
+EXACT = 1e-12
+
+
+def reference(corpus, damping_factor):
+    """
+    Returns the PageRank of every page of `corpus` from the textbook
+    formula over plain dicts, where a page without links links to
+    every page, iterated until the ranks stop changing.
+    """
+    n = len(corpus)
+    ranks = {page: 1 / n for page in corpus}
+    while True:
+        new = {}
+        for page in corpus:
+            total = 0
+            for other, links in corpus.items():
+                if not links:
+                    total += ranks[other] / n
+                elif page in links:
+                    total += ranks[other] / len(links)
+            new[page] = (1 - damping_factor) / n + damping_factor * total
+        if max(abs(new[page] - ranks[page]) for page in corpus) < EXACT:
+            return new
+        ranks = new
+
+
+@pytest.fixture(scope="module")
+def graph():
+    """
+    Builds a synthetic graph with pages without links and several
+    components, with its ranks converged far past the usual tolerance.
+    """
+    graph = benchmark.generate(2000, 11)
+    return graph, ranking.solve(graph, DAMPING, tolerance=EXACT)
+
+
+def test_iterate_matches_reference():
+    ranks = pagerank.iterate_pagerank(CORPUS, DAMPING, tolerance=EXACT)
+    expected = reference(CORPUS, DAMPING)
+    assert ranks.keys() == expected.keys()
+    for page in expected:
+        assert ranks[page] == pytest.approx(expected[page], abs=1e-9)
+    assert sum(ranks.values()) == pytest.approx(1)
+
+
+def test_iterate_default_tolerance(graph):
+    # The error is at most the last change times d / (1 - d)
+    graph, exact = graph
+    stats = {}
+    ranks = ranking.power_iteration(graph, DAMPING, stats=stats)
+    assert stats["residual"] <= ranking.TOLERANCE
+    assert abs(ranks - exact).sum() <= (
+        stats["residual"] * DAMPING / (1 - DAMPING)
+    )
+
+
+def test_python_step_matches_numpy_step(graph):
+    graph, exact = graph
+    n = len(graph)
+    ranks = ranking.iterate(ranking.python_step(graph, DAMPING),
+                            [1 / n] * n, EXACT)
+    assert max(abs(a - b) for a, b in zip(ranks, exact)) < 1e-12
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_sampling_agrees_with_iteration(processes):
+    expected = reference(CORPUS, DAMPING)
+    corpus = LinkGraph.from_corpus(CORPUS)
+    ranks = sampling.sample_ranks(corpus, DAMPING, 200000, seed=3,
+                                  walkers=1000, processes=processes)
+    assert ranks.sum() == pytest.approx(1)
+    for page, rank in corpus.ranks(ranks).items():
+        assert rank == pytest.approx(expected[page], abs=0.01)
+
+
+def test_python_sampling_agrees_with_iteration():
+    expected = reference(CORPUS, DAMPING)
+    corpus = LinkGraph.from_corpus(CORPUS)
+    ranks = sampling.python_sample(corpus, DAMPING, 50000, seed=3)
+    for page, rank in corpus.ranks(ranks).items():
+        assert rank == pytest.approx(expected[page], abs=0.02)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """
+    Writes CORPUS as a directory of HTML pages, linking to pages in a
+    few equivalent ways and to places outside the corpus.
+    """
+    directory = tmp_path / "corpus"
+    directory.mkdir()
+    for number, (page, links) in enumerate(sorted(CORPUS.items())):
+        hrefs = sorted(links) + [page, "https://example.com/", "../x.html"]
+        if number % 2:
+            hrefs = [f"./{href}" for href in hrefs]
+        anchors = "".join(f'<a href="{href}">link</a>\n' for href in hrefs)
+        (directory / page).write_text(f"<html><body>\n{anchors}</body>\n")
+    return str(directory)
+
+
+@pytest.mark.parametrize("processes,threads", [(1, False), (2, False),
+                                               (2, True)])
+def test_crawl_graph_matches_crawl(corpus, processes, threads):
+    stats = {}
+    graph = crawler.crawl_graph(corpus, processes, threads, stats=stats)
+    expected = LinkGraph.from_corpus(CORPUS)
+    assert list(graph.pages) == list(expected.pages)
+    assert list(graph.offsets) == list(expected.offsets)
+    assert list(graph.targets) == list(expected.targets)
+    assert stats["files"] == len(CORPUS)
+
+
+def test_crawl_graph_into_file(corpus, tmp_path, monkeypatch):
+    # Flushing after every page spills every link to disk
+    monkeypatch.setattr(crawler, "FLUSH_LINKS", 1)
+    output = str(tmp_path / "corpus.graph")
+    graph = crawler.crawl_graph(corpus, 1, output=output)
+    expected = LinkGraph.from_corpus(CORPUS)
+    assert list(graph.pages) == list(expected.pages)
+    assert list(graph.targets) == list(expected.targets)
+    assert sorted(os.listdir(tmp_path)) == ["corpus", "corpus.graph"]
+
+
+@pytest.mark.parametrize("push", [False, True])
+def test_incremental_matches_cold_iteration(tmp_path, push):
+    filename = str(tmp_path / "state")
+    old = LinkGraph.from_corpus(CORPUS)
+    incremental.update_ranks(old, DAMPING, filename, EXACT)
+
+    changed = dict(CORPUS, **{"4.html": {"3.html"}, "7.html": {"2.html"}})
+    del changed["6.html"]
+    new = LinkGraph.from_corpus(changed)
+    stats = {}
+    ranks = incremental.update_ranks(new, DAMPING, filename, EXACT,
+                                     push=push, stats=stats)
+    expected = reference(changed, DAMPING)
+    for page, rank in new.ranks(ranks).items():
+        assert rank == pytest.approx(expected[page], abs=1e-9)
+    assert stats["warm_start"]
+    assert (stats["added"], stats["removed"], stats["changed"]) == (1, 1, 1)
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:len(data) // 2],
+    lambda data: b"not a state file",
+    lambda data: b"",
+])
+def test_incremental_cold_starts_from_corrupt_state(tmp_path, corrupt):
+    filename = tmp_path / "state"
+    graph = LinkGraph.from_corpus(CORPUS)
+    incremental.update_ranks(graph, DAMPING, str(filename), EXACT)
+    filename.write_bytes(corrupt(filename.read_bytes()))
+    stats = {}
+    ranks = incremental.update_ranks(graph, DAMPING, str(filename), EXACT,
+                                     stats=stats)
+    assert not stats["warm_start"]
+    expected = reference(CORPUS, DAMPING)
+    for page, rank in graph.ranks(ranks).items():
+        assert rank == pytest.approx(expected[page], abs=1e-9)
+    assert incremental.load_state(str(filename))[0].pages == graph.pages
+
+
+def test_failed_state_save_leaves_nothing(tmp_path, monkeypatch):
+    import numpy
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(numpy, "savez", fail)
+    graph = LinkGraph.from_corpus(CORPUS)
+    with pytest.raises(OSError):
+        incremental.save_state(str(tmp_path / "state"), graph,
+                               [1 / len(graph)] * len(graph))
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("state", [False, True])
+def test_incremental_main_keeps_state_out_of_corpus(
+        corpus, tmp_path, monkeypatch, capsys, state):
+    monkeypatch.setenv("PAGERANK_CACHE", str(tmp_path / "cache"))
+    argv = ["incremental.py", corpus]
+    if state:
+        argv += ["push", "--state", str(tmp_path / "saved")]
+    monkeypatch.setattr(sys, "argv", argv)
+    for run in range(2):
+        incremental.main()
+        stats = json.loads(capsys.readouterr().out)
+        assert stats["warm_start"] == bool(run)
+    assert sorted(os.listdir(corpus)) == sorted(CORPUS)
+    if state:
+        assert (tmp_path / "saved").is_file()
+        assert not (tmp_path / "cache").exists()
+    else:
+        assert os.listdir(tmp_path / "cache") == [
+            os.path.basename(incremental.state_file(corpus))
+        ]
+
+
+@pytest.mark.parametrize("argv", [["--state"], ["push", "--state"], ["pull"],
+                                  ["push", "push"]])
+def test_incremental_main_usage(corpus, monkeypatch, argv):
+    monkeypatch.setattr(sys, "argv", ["incremental.py", corpus] + argv)
+    with pytest.raises(SystemExit, match="Usage:"):
+        incremental.main()
+
+
+def test_graph_file_round_trip(graph, tmp_path):
+    graph, exact = graph
+    filename = str(tmp_path / "synthetic.graph")
+    graph.save(filename)
+    opened = LinkGraph.open(filename)
+    assert opened.pages == graph.pages
+    assert list(opened.offsets) == list(graph.offsets)
+    assert list(opened.targets) == list(graph.targets)
+    ranks = ranking.solve(opened, DAMPING, tolerance=EXACT)
+    assert abs(ranks - exact).max() < 1e-12
+
+
+def test_graph_file_rejects_other_files(tmp_path):
+    filename = tmp_path / "not.graph"
+    filename.write_bytes(b"not a graph")
+    with pytest.raises(ValueError):
+        LinkGraph.open(str(filename))
+
+
+def test_failed_graph_write_leaves_nothing(tmp_path):
+    filename = str(tmp_path / "short.graph")
+    with pytest.raises(ValueError):
+        write_graph(filename, ["a.html", "b.html"], array("q", [0, 1, 2]),
+                    [array("i", [1])])
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("solver", ["power", "extrapolated"])
+def test_power_step_in_chunks(graph, monkeypatch, solver):
+    # Chunks of a few links still add up every link once
+    graph, exact = graph
+    monkeypatch.setattr(ranking, "STEP_LINKS", 7)
+    ranks = ranking.solve(graph, DAMPING, solver, tolerance=EXACT)
+    assert abs(ranks - exact).max() < 1e-12
+
+
+def test_personalized_to_every_page_is_pagerank(graph):
+    graph, exact = graph
+    top = personalized.personalized_top(
+        graph, [range(len(graph))], DAMPING, k=20, tolerance=EXACT
+    )[0]
+    for page, rank in top:
+        assert rank == pytest.approx(exact[page], abs=1e-9)
+    assert [rank for _, rank in top] == pytest.approx(
+        sorted(exact, reverse=True)[:20], abs=1e-9
+    )
+
+
+def test_forward_push_agrees_with_power_iteration(graph):
+    graph, _ = graph
+    seeds = [[0, 1], [5], [1500, 1999]]
+    exact = personalized.personalized_top(
+        graph, seeds, DAMPING, k=5, tolerance=EXACT, batch=2
+    )
+    for pages, expected in zip(seeds, exact):
+        expected = dict(expected)
+        top = personalized.forward_push(graph, pages, DAMPING, k=5, seed=2)
+        for page, rank in top:
+            assert rank == pytest.approx(expected.get(page, 0), abs=0.01)
+
+
+@pytest.mark.parametrize("solver", sorted(ranking.SOLVERS))
+def test_solvers_agree(graph, solver):
+    graph, exact = graph
+    stats = {}
+    ranks = ranking.solve(graph, DAMPING, solver, tolerance=EXACT,
+                          stats=stats)
+    assert abs(ranks - exact).max() < 1e-12
+    assert stats["solver"] == solver
+    assert len(stats["history"]) == stats["iterations"]
+    assert stats["history"][-1]["l1"] == stats["residual"] <= EXACT
+
+
+@pytest.mark.parametrize("solver", sorted(ranking.SOLVERS))
+def test_solvers_match_reference(solver):
+    ranks = pagerank.iterate_pagerank(CORPUS, DAMPING, solver, EXACT)
+    expected = reference(CORPUS, DAMPING)
+    for page in expected:
+        assert ranks[page] == pytest.approx(expected[page], abs=1e-9)
+
+
+def test_solve_rejects_unknown_solver(graph):
+    graph, _ = graph
+    with pytest.raises(ValueError, match="unknown solver"):
+        ranking.solve(graph, DAMPING, "jacobi")
+
+
+def test_benchmark_python_engine_matches_solve(graph):
+    graph, _ = graph
+    stats, expected = {}, {}
+    ranks = benchmark.python_power(graph, DAMPING, ranking.TOLERANCE, stats)
+    solved = ranking.solve(graph, DAMPING, stats=expected)
+    assert max(abs(a - b) for a, b in zip(ranks, solved)) < 1e-12
+    assert stats["iterations"] == expected["iterations"]
+
+
+# Pieces of pages, well-formed on their own, that the scanner and
+# html.parser must read the same way in any order
+SNIPPETS = [
+    b'<a href="1.html">one</a>',
+    b"<a href='2.html'>two</a>",
+    b"<a href=3.html>three</a>",
+    b'<A HREF="4.html">four</A>',
+    b'<a class="nav" id=x href="5.html" title=\'t\'>five</a>',
+    b'<a href="6.html"title="no space">six</a>',
+    b'<a href="a.html?x=1&amp;y=2">amp</a>',
+    b'<a href="&#55;.html">seven</a>',
+    b'<a name="top">no href</a>',
+    b'<a href="8.html" href="9.html">first href</a>',
+    b"<!-- <a href=\"hidden.html\"> -->",
+    b"<script>var s = '<a href=\"script.html\">';</script>",
+    b"<style>a[href='style.html'] { color: red }</style>",
+    b"<abbr href=\"abbr.html\">not an anchor</abbr>",
+    b'<a\nhref="multi.html"\n>lines</a>',
+    b"<p>caf\xc3\xa9 &amp; text</p>",
+]
+
+
+def parser_hrefs(data):
+    """
+    Returns the hrefs html.parser finds in the bytes `data`.
+    """
+    return extraction.parse_hrefs(io.BytesIO(data))
+
+
+def test_find_hrefs_reads_every_form():
+    hrefs, flagged = extraction.find_hrefs(b"\n".join(SNIPPETS))
+    assert not flagged
+    assert hrefs == [
+        b"1.html", b"2.html", b"3.html", b"4.html", b"5.html", b"6.html",
+        b"a.html?x=1&y=2", b"7.html", b"8.html", b"multi.html"
+    ]
+
+
+@pytest.mark.parametrize("page", [
+    b'<a href="1.html">one</a><!-- <a href="2.html">',
+    b'<a href="1.html">one</a><script>document.write("<a href=x>")',
+    b'<a href="1.html">one</a><a href="2.html',
+    b'<a href="1.html" title="x',
+])
+def test_malformed_pages_fall_back_to_html_parser(tmp_path, page):
+    hrefs, flagged = extraction.find_hrefs(page)
+    assert flagged
+    filename = tmp_path / "page.html"
+    filename.write_bytes(page)
+    assert extraction.read_hrefs(str(filename)) == (
+        parser_hrefs(page), len(page), True
+    )
+
+
+def test_read_hrefs_maps_large_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, "MMAP_BYTES", 16)
+    page = b"\n".join(SNIPPETS)
+    filename = tmp_path / "page.html"
+    filename.write_bytes(page)
+    assert extraction.read_hrefs(str(filename)) == (
+        parser_hrefs(page), len(page), False
+    )
+
+
+def test_scanner_agrees_with_html_parser():
+    rng = random.Random(5)
+    for _ in range(200):
+        page = b"\n".join(rng.choices(SNIPPETS, k=rng.randrange(1, 12)))
+        hrefs, flagged = extraction.find_hrefs(page)
+        assert not flagged
+        assert hrefs == parser_hrefs(page), page